@@ -0,0 +1,295 @@
+"""Benchmark for the highlight listener.
+
+Drives ``utility.highlight_core`` with fake guilds, members and messages and
+an in-memory stand-in for the database pool, so nothing touches the network
+or Postgres. It still needs the bot's dependencies and a ``config/info.json``
+since ``cogs.utility`` imports ``bot``.
+
+Run it from the repository root::
+
+    python -m benchmarks.highlight --guilds 500 --users 40 --words 5 --messages 20000
+
+Per-message latency percentiles are always reported. ``--allocations`` does
+a second pass under :mod:`tracemalloc` and ``--compare`` times the old linear
+scan over the whole highlight cache against the per-guild matchers.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime
+import logging
+import random
+import statistics
+import string
+import time
+import tracemalloc
+from typing import Any, Optional
+
+
+class FakePool:
+    """Answers every query with nothing."""
+
+    async def fetch(self, query: str, *args: Any) -> list:
+        return []
+
+    async def fetchrow(self, query: str, *args: Any) -> None:
+        return None
+
+    async def fetchval(self, query: str, *args: Any) -> None:
+        return None
+
+    async def execute(self, query: str, *args: Any) -> str:
+        return 'SELECT 0'
+
+    async def executemany(self, query: str, args: Any) -> None:
+        return None
+
+
+class FakePermissions:
+    read_messages = True
+
+
+class FakeUser:
+    def __init__(self, id: int, *, bot: bool = False) -> None:
+        self.id = id
+        self.bot = bot
+        self.name = f'user{id}'
+        self.mention = f'<@{id}>'
+
+    async def send(self, *args: Any, **kwargs: Any) -> None:
+        return None
+
+
+class FakeChannel:
+    def __init__(self, id: int) -> None:
+        self.id = id
+        self.mention = f'<#{id}>'
+
+    def permissions_for(self, member: FakeUser) -> FakePermissions:
+        return FakePermissions()
+
+
+class FakeGuild:
+    def __init__(self, id: int, members: dict[int, FakeUser], channels: list[FakeChannel]) -> None:
+        self.id = id
+        self.members = members
+        self.channels = channels
+
+    def get_member(self, user_id: int) -> Optional[FakeUser]:
+        return self.members.get(user_id)
+
+
+class FakeMessage:
+    def __init__(self, id: int, guild: FakeGuild, channel: FakeChannel, author: FakeUser, content: str) -> None:
+        self.id = id
+        self.guild = guild
+        self.channel = channel
+        self.author = author
+        self.content = content
+        self.mentions: list[FakeUser] = []
+        self.created_at = datetime.datetime.now(datetime.timezone.utc)
+        self.jump_url = f'https://discord.com/channels/{guild.id}/{channel.id}/{id}'
+
+
+class FakeBot:
+    PRE = ('m.', 'm?')
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+        self.db = FakePool()
+
+    def is_closed(self) -> bool:
+        return False
+
+    def dispatch(self, event: str, *args: Any) -> None:
+        pass
+
+    def get_cog(self, name: str) -> None:
+        return None
+
+    async def is_command_invocation(self, message: FakeMessage) -> bool:
+        return message.content.startswith(self.PRE)
+
+
+def make_vocabulary(rng: random.Random, size: int) -> list[str]:
+    words = set()
+    while len(words) < size:
+        words.add(''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))))
+    return list(words)
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    index = min(len(samples) - 1, max(0, round(pct / 100 * len(samples)) - 1))
+    return samples[index]
+
+
+def report(title: str, samples_ns: list[int], elapsed: float) -> None:
+    samples = sorted(x / 1000 for x in samples_ns)
+    print(f'\n{title}')
+    print(f'  messages    {len(samples)} in {elapsed:.2f}s ({len(samples) / elapsed:,.0f}/s)')
+    print(f'  mean        {statistics.fmean(samples):,.1f}us')
+    for pct in (50, 90, 99, 99.9):
+        print(f'  p{pct:<10} {percentile(samples, pct):,.1f}us')
+    print(f'  max         {samples[-1]:,.1f}us')
+
+
+class Scenario:
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.vocabulary = make_vocabulary(self.rng, args.vocabulary)
+
+        self.guilds: list[FakeGuild] = []
+        # (guild_id, user_id) -> words, the shape of utility.highlight_cache
+        self.highlights: dict[tuple[int, int], list[str]] = {}
+
+        user_id = 10_000
+        for guild_index in range(args.guilds):
+            guild_id = 1_000_000 + guild_index
+            channels = [FakeChannel(guild_id * 100 + n) for n in range(args.channels)]
+            members: dict[int, FakeUser] = {}
+            for _ in range(args.users):
+                user_id += 1
+                members[user_id] = FakeUser(user_id)
+                self.highlights[(guild_id, user_id)] = self.rng.sample(self.vocabulary, args.words)
+            self.guilds.append(FakeGuild(guild_id, members, channels))
+
+    def messages(self):
+        for message_id in range(self.args.messages):
+            guild = self.rng.choice(self.guilds)
+            channel = self.rng.choice(guild.channels)
+            author = self.rng.choice(list(guild.members.values()))
+            words = self.rng.choices(self.vocabulary, k=self.rng.randint(3, 30))
+            if self.rng.random() < self.args.hit_ratio:
+                hit_user = self.rng.choice(list(guild.members))
+                words.append(self.rng.choice(self.highlights[(guild.id, hit_user)]))
+                self.rng.shuffle(words)
+            yield FakeMessage(message_id, guild, channel, author, ' '.join(words))
+
+
+async def run_listener(scenario: Scenario, *, trace: bool) -> None:
+    from cogs.utility import utility
+
+    bot = FakeBot(asyncio.get_running_loop())
+    cog = utility(bot)  # type: ignore
+
+    delivered = 0
+
+    async def deliver(user_id: int, channel_id: int, hits: list) -> None:
+        nonlocal delivered
+        delivered += len(hits)
+
+    cog.highlight_queue.deliver = deliver
+    for (guild_id, user_id), words in scenario.highlights.items():
+        for word in words:
+            cog.add_highlight(guild_id, user_id, word)
+
+    messages = list(scenario.messages())
+    interval = 1 / scenario.args.rate if scenario.args.rate else 0
+    samples: list[int] = []
+
+    if trace:
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+
+    start = time.perf_counter()
+    for message in messages:
+        t0 = time.perf_counter_ns()
+        await cog.highlight_core(message)  # type: ignore
+        samples.append(time.perf_counter_ns() - t0)
+        if interval:
+            await asyncio.sleep(interval)
+    elapsed = time.perf_counter() - start
+
+    if trace:
+        after = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        stats = after.compare_to(before, 'filename')
+        size = sum(stat.size_diff for stat in stats)
+        blocks = sum(stat.count_diff for stat in stats)
+        print('\nallocations (highlight_core under tracemalloc)')
+        print(f'  retained    {size / 1024:,.1f} KiB in {blocks:,} blocks')
+        print(f'  per message {size / len(messages):,.1f} B')
+        print(f'  peak        {peak / 1024:,.1f} KiB')
+        for stat in stats[:5]:
+            print(f'    {stat}')
+    else:
+        report('highlight_core', samples, elapsed)
+
+    await asyncio.sleep(cog.highlight_queue.window + 0.1)
+    await cog.cog_unload()
+    if not trace:
+        print(f'  delivered   {delivered} hits ({cog.highlight_queue.dropped} dropped)')
+
+
+def run_compare(scenario: Scenario) -> None:
+    from utils.highlight import HighlightMatcher
+
+    matchers: dict[int, HighlightMatcher] = {}
+    for (guild_id, user_id), words in scenario.highlights.items():
+        matcher = matchers.setdefault(guild_id, HighlightMatcher())
+        for word in words:
+            matcher.add(word, user_id)
+
+    messages = list(scenario.messages())
+    for matcher in matchers.values():
+        matcher.find('')  # compile outside of the timed loop
+
+    def linear(message: FakeMessage) -> dict[int, str]:
+        matches: dict[int, str] = {}
+        for (guild_id, user_id), words in scenario.highlights.items():
+            if guild_id != message.guild.id:
+                continue
+            for word in words:
+                if word in message.content:
+                    matches.setdefault(user_id, word)
+                    break
+        return matches
+
+    def automaton(message: FakeMessage) -> dict[int, str]:
+        return matchers[message.guild.id].match(message.content)
+
+    for title, func in (('linear scan (old)', linear), ('per-guild automaton', automaton)):
+        samples: list[int] = []
+        start = time.perf_counter()
+        for message in messages:
+            t0 = time.perf_counter_ns()
+            func(message)
+            samples.append(time.perf_counter_ns() - t0)
+        report(title, samples, time.perf_counter() - start)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--guilds', type=int, default=200, help='number of guilds')
+    parser.add_argument('--users', type=int, default=25, help='users with highlights per guild')
+    parser.add_argument('--words', type=int, default=5, help='highlight words per user')
+    parser.add_argument('--channels', type=int, default=5, help='channels per guild')
+    parser.add_argument('--vocabulary', type=int, default=20000, help='size of the synthetic word pool')
+    parser.add_argument('--messages', type=int, default=10000, help='messages to feed through the listener')
+    parser.add_argument('--rate', type=float, default=0, help='messages per second, 0 for as fast as possible')
+    parser.add_argument('--hit-ratio', type=float, default=0.1, help='share of messages containing a highlighted word')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--allocations', action='store_true', help='also measure allocations with tracemalloc')
+    parser.add_argument('--compare', action='store_true', help='also time the old linear scan against the matchers')
+    args = parser.parse_args()
+
+    scenario = Scenario(args)
+    print(f'{args.guilds} guilds, {len(scenario.highlights)} users, {len(scenario.highlights) * args.words} highlight rows')
+
+    # importing the bot sets up logging, keep it quiet
+    logging.disable(logging.CRITICAL)
+
+    asyncio.run(run_listener(scenario, trace=False))
+    if args.allocations:
+        asyncio.run(run_listener(Scenario(args), trace=True))
+    if args.compare:
+        run_compare(Scenario(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -10,7 +10,8 @@ from discord.abc import Snowflake
 import asyncio
 import datetime
 import re
-from typing import Any, List, Optional, Tuple, Union
+import time
+from typing import Any, Callable, List, Optional, Tuple, Union
 import asyncpixel
 from pathlib import Path
 import os
@@ -27,10 +28,15 @@ from cogs.tickets.views import CreateTicketView, CloseTicketView, SupportControl
 from utils.checks import check_dev
 from utils.constants import BOT_OWNER_ID, DEFAULT_INVITE, DEVELOPER_IDS, DOCUMENTATION, EMOTES, GITHUB_URL, PATREON_URL, PRIVACY_POLICY, SUPPORT_GUILD, SUPPORT_STAFF, SUPPORT_URL, TEST_BOT_ID
 from utils.logger import setup_logging
+from utils.premium import PremiumCache
+from utils.snapshot import Caches, SavedCaches, read_snapshot, validate_snapshot, write_snapshot
+from utils.extensions import find_extensions, load_extensions
 from utils.remind_utils import human_timedelta
 from utils.json_loader import read_json
 from utils.errors import UserBlacklisted
 from utils.custom_context import MyContext
+from utils.db import run_sql_migrations
+from utils.metrics import COMMAND_LATENCY, COMMAND_PHASE_LATENCY, LISTENER_LATENCY, MetricsConnection
 
 os.environ["JISHAKU_NO_UNDERSCORE"] = "True"
 os.environ["JISHAKU_NO_DM_TRACEBACK"] = "True"
@@ -61,7 +67,7 @@ async def create_db_pool(user, password, database, host, port) -> asyncpg.Pool:
         "host" : host,
         "port" : port
     }
-    return await asyncpg.create_pool(**details)
+    return await asyncpg.create_pool(**details, connection_class=MetricsConnection)
     
 class MetroBot(commands.AutoShardedBot):
 #class MetroBot(commands.Bot):
@@ -115,6 +121,8 @@ class MetroBot(commands.AutoShardedBot):
         self.hypixel = asyncpixel.Hypixel(info_file['hypixel_api_key'])
 
         self.add_check(self.user_blacklisted)
+        self.before_invoke(self.mark_callback_started)
+        self.after_invoke(self.mark_callback_ended)
 
         self.maintenance = False
         self.owner: Optional[discord.User] = None
@@ -128,12 +136,16 @@ class MetroBot(commands.AutoShardedBot):
 
         #Cache
         self.prefixes: dict[int, list[str]] = {}
+        self._prefix_patterns: dict[tuple[str, ...], re.Pattern] = {}
+        self._command_invocations: dict[int, bool] = {}
         self.blacklist: dict[int, bool] = {}
         self.guildblacklist: dict[int, bool] = {}
         self.app_commands: dict[str, int] = {}
         
-        self.premium_users: dict[int, bool] = {}
-        self.premium_guilds: dict[int, bool] = {}
+        self.premium = PremiumCache()
+
+        # caches read from the snapshot of the last restart, taken once each
+        self.cache_snapshot: SavedCaches = {}
 
         #Tracking
         self.command_stats = Counter()
@@ -219,77 +231,256 @@ class MetroBot(commands.AutoShardedBot):
             commands = await self.tree.fetch_commands(guild=guild.id if guild else None)
         self.app_commands = {cmd.name: cmd.id for cmd in commands}
 
+    # rows fetched per round trip while streaming a cache query
+    CACHE_PREFETCH = 1000
+
+    async def load_cache(self, name: str, query: str, callback: Callable[[asyncpg.Record], Any]) -> int:
+        """Stream a query's rows into ``callback`` on a connection of its own.
+
+        Rows are read with a server-side cursor so the whole result is never
+        held in memory at once. Returns how many rows were loaded."""
+
+        start = time.perf_counter()
+        count = 0
+        async with self.db.acquire() as connection:
+            async with connection.transaction(readonly=True):
+                async for record in connection.cursor(query, prefetch=self.CACHE_PREFETCH):
+                    callback(record)
+                    count += 1
+
+        self.logger.info('Loaded %s rows into the %s cache in %.2fms', count, name, (time.perf_counter() - start) * 1000)
+        return count
+
+    async def restore_caches(self, *names: str) -> dict[str, Any]:
+        """Take caches out of the restart snapshot, leaving out those that aren't valid.
+
+        The snapshot is read before logging in, so the versions of the tables
+        are checked again here, right before the caches are used."""
+
+        caches = {name: self.cache_snapshot.pop(name) for name in names if name in self.cache_snapshot}
+        try:
+            return await validate_snapshot(self.db, caches)
+        except Exception:
+            self.logger.exception('Could not validate the cache snapshot')
+            return {}
+
+    async def restore_cache(self, name: str) -> Optional[Any]:
+        """Take a cache out of the restart snapshot, ``None`` if it wasn't valid."""
+
+        return (await self.restore_caches(name)).get(name)
+
+    async def load_cache_snapshot(self) -> None:
+        """Read the caches saved by the last restart."""
+
+        try:
+            self.cache_snapshot = await read_snapshot(self.db, max_age=info_file.get('cache_snapshot_max_age', 300))
+        except Exception:
+            self.logger.exception('Could not load the cache snapshot')
+
+    def dump_caches(self) -> Caches:
+        """The caches worth keeping across a restart and the tables they come from.
+
+        Cogs that load caches of their own add them with a ``dump_caches`` method."""
+
+        caches: Caches = {
+            'prefixes': (('prefixes',), list(self.prefixes.items())),
+            'premium guilds': (('premium_guilds',), list(self.premium.guilds)),
+            'premium users': (
+                ('votes',), [(user_id, expires.timestamp()) for user_id, expires in self.premium.users.items()]
+            ),
+            'guild blacklist': (('guild_blacklist',), [guild for guild, value in self.guildblacklist.items() if value]),
+            'member blacklist': (('blacklist',), [member for member, value in self.blacklist.items() if value]),
+        }
+
+        utility_cog = self.get_cog('utility') # type: ignore
+        if utility_cog:
+            caches['highlight'] = (
+                ('highlight',),
+                [(guild_id, user_id, words) for (guild_id, user_id), words in utility_cog.highlight_cache.items()]
+            )
+            caches['highlight ignore list'] = (
+                ('highlight_ignored',),
+                [(guild_id, user_id, list(ids)) for (guild_id, user_id), ids in utility_cog.highlight_ignored.items()]
+            )
+
+        serverutils_cog = self.get_cog('serverutils')
+        if serverutils_cog:
+            caches['afk'] = (('afk',), [user for user, value in serverutils_cog.afk_users.items() if value])
+
+        for cog in self.cogs.values():
+            dump = getattr(cog, 'dump_caches', None)
+            if dump is not None:
+                caches.update(dump())
+        return caches
+
+    async def save_cache_snapshot(self) -> None:
+        """Save the caches so the next process can skip loading them."""
+
+        try:
+            await write_snapshot(self.db, self.dump_caches)
+        except Exception:
+            self.logger.exception('Could not save the cache snapshot')
+
+    async def restore_bot_caches(self) -> set[str]:
+        """Fill the caches of :meth:`fill_bot_cache` from the restart snapshot.
+
+        Returns the names of the caches that were restored."""
+
+        caches = await self.restore_caches(
+            'prefixes', 'premium guilds', 'premium users', 'guild blacklist',
+            'member blacklist', 'highlight', 'highlight ignore list', 'afk'
+        )
+        restored: set[str] = set()
+        utility_cog = self.get_cog('utility') # type: ignore
+        serverutils_cog = self.get_cog('serverutils')
+
+        data = caches.get('prefixes')
+        if data is not None:
+            for guild_id, prefixes in data:
+                self.prefixes.setdefault(guild_id, prefixes)
+            restored.add('prefixes')
+
+        data = caches.get('premium guilds')
+        if data is not None:
+            for guild_id in data:
+                self.premium.add_guild(guild_id)
+            restored.add('premium guilds')
+
+        data = caches.get('premium users')
+        if data is not None:
+            for user_id, expires in data:
+                self.premium.add_user(user_id, datetime.datetime.fromtimestamp(expires, datetime.timezone.utc))
+            restored.add('premium users')
+
+        data = caches.get('guild blacklist')
+        if data is not None:
+            for guild_id in data:
+                self.guildblacklist[guild_id] = True
+            restored.add('guild blacklist')
+
+        data = caches.get('member blacklist')
+        if data is not None:
+            for member_id in data:
+                self.blacklist[member_id] = True
+            restored.add('member blacklist')
+
+        data = caches.get('highlight')
+        if data is not None and utility_cog:
+            for guild_id, user_id, words in data:
+                for word in words:
+                    utility_cog.add_highlight(guild_id, user_id, word)
+            restored.add('highlight')
+
+        data = caches.get('highlight ignore list')
+        if data is not None and utility_cog:
+            for guild_id, user_id, ids in data:
+                for entity_id in ids:
+                    utility_cog.ignore_highlight_entity(guild_id, user_id, entity_id)
+            restored.add('highlight ignore list')
+
+        data = caches.get('afk')
+        if data is not None and serverutils_cog:
+            for user_id in data:
+                serverutils_cog.afk_users[user_id] = True
+            restored.add('afk')
+
+        return restored
+
     async def fill_bot_cache(self):
         """Fill the bot's utility cache.
         
-        This is called upon startup or through a manual command."""
+        This is called upon startup or through a manual command.
+        Caches still valid in the restart snapshot are taken from it,
+        the rest are loaded at the same time on their own connections."""
 
         await self.wait_until_ready()
+        start = time.perf_counter()
+        restored = await self.restore_bot_caches()
 
-        # premium guilds cache
-        query = """
+        utility_cog = self.get_cog('utility') # type: ignore
+        serverutils_cog = self.get_cog('serverutils')
+
+        def load_premium_guild(record: asyncpg.Record) -> None:
+            self.premium.add_guild(record['server'])
+
+        def load_premium_user(record: asyncpg.Record) -> None:
+            self.premium.add_user(record['user_id'], pytz.utc.localize(record['next_vote']))
+
+        def load_guild_blacklist(record: asyncpg.Record) -> None:
+            self.guildblacklist[record['guild']] = True
+
+        def load_member_blacklist(record: asyncpg.Record) -> None:
+            self.blacklist[record['member_id']] = True
+
+        def load_highlight(record: asyncpg.Record) -> None:
+            utility_cog.add_highlight(record['guild_id'], record['author_id'], record['text'])
+
+        def load_highlight_ignored(record: asyncpg.Record) -> None:
+            utility_cog.ignore_highlight_entity(record['guild_id'], record['user_id'], record['entity_id'])
+
+        def load_afk(record: asyncpg.Record) -> None:
+            serverutils_cog.afk_users[record['_user']] = True
+
+        stages = [
+            (
+                'premium guilds',
+                """
                 SELECT server FROM premium_guilds WHERE is_premium = True
+                """,
+                load_premium_guild
+            ),
+            (
+                # a vote's perks last until the user can vote again
+                'premium users',
                 """
-        records = await self.db.fetch(query)
-        if records:
-            for record in records:
-                self.premium_guilds[record['server']] = True
-
-        # premium users / voters cache
-        query = """
-                SELECT (user_id, next_vote) FROM votes
+                SELECT user_id, next_vote FROM votes WHERE next_vote > (NOW() AT TIME ZONE 'utc')
+                """,
+                load_premium_user
+            ),
+            (
+                'guild blacklist',
                 """
-        records = await self.db.fetch(query)
-        if records:
-            for record in records:
-                next_vote = pytz.utc.localize(record['row'][1])
-                if discord.utils.utcnow() < (next_vote - datetime.timedelta(hours=12)):
-                    self.premium_users[record['row'][0]] = True
-
-        # guild blacklist cache
-        query = """
                 SELECT guild FROM guild_blacklist WHERE verify = True
+                """,
+                load_guild_blacklist
+            ),
+            (
+                'member blacklist',
                 """
-        records = await self.db.fetch(query)
-        if records:
-            for record in records:
-                self.guildblacklist[record["guild"]] = True
-
-        # member blacklist cache
-        query = """
                 SELECT member_id FROM blacklist WHERE is_blacklisted = True
+                """,
+                load_member_blacklist
+            ),
+            (
+                'highlight',
                 """
-
-        records = await self.db.fetch(query)
-        if records:
-            for record in records:
-                self.blacklist[record["member_id"]] = True
-        
-        # highlight cache
-        utility_cog = self.get_cog('utility') # type: ignore
-        query = """
-                SELECT * FROM highlight
+                SELECT guild_id, author_id, text FROM highlight
+                """,
+                load_highlight
+            ),
+            (
+                'highlight ignore list',
                 """
-        records = await self.db.fetch(query)
-        if records:
-            for record in records:
-                if utility_cog.highlight_cache.get((record['guild_id'], record['author_id'])):
-                    utility_cog.highlight_cache[(record['guild_id'], record['author_id'])].append(record['text'])
-                else:
-                    utility_cog.highlight_cache[(record['guild_id'], record['author_id'])] = [record['text']]
-
-        # afk cache
-        serverutils_cog = self.get_cog('serverutils')
-        query = """
-                SELECT _user FROM afk WHERE is_afk = True
+                SELECT user_id, guild_id, entity_id FROM highlight_ignored
+                """,
+                load_highlight_ignored
+            ),
+            (
+                'afk',
                 """
-
-        records = await self.db.fetch(query)
-        if records:
-            for record in records:
-                serverutils_cog.afk_users[record['_user']] = True
-        
-        logging.info('Bot\'s cache was refreshed.')
+                SELECT _user FROM afk WHERE is_afk = True
+                """,
+                load_afk
+            ),
+        ]
+        await asyncio.gather(*(
+            self.load_cache(name, query, callback) for name, query, callback in stages if name not in restored
+        ))
+
+        logging.info(
+            'Bot\'s cache was refreshed in %.2fms, %s of %s caches came from the restart snapshot.',
+            (time.perf_counter() - start) * 1000, len(restored & {name for name, _, _ in stages}), len(stages)
+        )
 
     async def add_to_guildblacklist(
         self, guild: int, *, reason: Optional[str] = None, 
@@ -385,6 +576,15 @@ class MetroBot(commands.AutoShardedBot):
         await self.fill_bot_cache()
         # fill the bot cache
 
+    async def _run_event(self, coro, event_name: str, *args: Any, **kwargs: Any) -> None:
+        """Override `_run_event` to time every listener."""
+
+        start = time.perf_counter()
+        try:
+            await super()._run_event(coro, event_name, *args, **kwargs)
+        finally:
+            LISTENER_LATENCY.observe(time.perf_counter() - start, event=event_name)
+
     def add_command(self, command: commands.Command):
         """Override `add_command` to make a default cooldown for every command"""
 
@@ -394,7 +594,65 @@ class MetroBot(commands.AutoShardedBot):
     async def get_context(self, message: Union[discord.Message, discord.Interaction], *, cls=MyContext):
         """Making our custom context"""
         
-        return await super().get_context(message, cls=cls)
+        start = time.perf_counter()
+        ctx = await super().get_context(message, cls=cls)
+        if isinstance(message, discord.Message):
+            ctx.timings['prefix'] = time.perf_counter() - start
+        return ctx
+
+    async def can_run(self, ctx: MyContext, /, *, call_once: bool = False) -> bool:
+        """Override `can_run` to time the global checks.
+
+        Only the calls made while a command is being prepared are counted.
+        Commands like help call this from their callback to filter other
+        commands, and that time belongs to the callback."""
+
+        if getattr(ctx, 'invoke_started', None) is None or ctx.callback_started is not None:
+            return await super().can_run(ctx, call_once=call_once)
+
+        start = time.perf_counter()
+        try:
+            return await super().can_run(ctx, call_once=call_once)
+        finally:
+            ctx.timings['checks'] = ctx.timings.get('checks', 0.0) + time.perf_counter() - start
+
+    async def mark_callback_started(self, ctx: MyContext) -> None:
+        ctx.callback_started = time.perf_counter()
+
+    async def mark_callback_ended(self, ctx: MyContext) -> None:
+        ctx.callback_ended = time.perf_counter()
+
+    async def invoke(self, ctx: MyContext) -> None:
+        """Override `invoke` to record how long each phase of a command takes.
+
+        Conversion covers everything between the global checks and the
+        callback, so command level checks and cooldowns are counted there.
+        Time spent in `ctx.send` is counted as response, not callback.
+        """
+
+        ctx.invoke_started = time.perf_counter()
+        try:
+            await super().invoke(ctx)
+        finally:
+            if ctx.command is not None:
+                self.record_command_timings(ctx, time.perf_counter())
+
+    def record_command_timings(self, ctx: MyContext, ended: float) -> None:
+        timings = ctx.timings
+        checks = timings.get('checks', 0.0)
+        phases = {'prefix': timings.get('prefix', 0.0), 'checks': checks}
+
+        if ctx.callback_started is not None:
+            response = timings.get('response', 0.0)
+            callback_ended = ctx.callback_ended or ended
+            phases['conversion'] = max(ctx.callback_started - ctx.invoke_started - checks, 0.0)
+            phases['callback'] = max(callback_ended - ctx.callback_started - response, 0.0)
+            phases['response'] = response
+
+        command = ctx.command.qualified_name
+        for phase, value in phases.items():
+            COMMAND_PHASE_LATENCY.observe(value, command=command, phase=phase)
+        COMMAND_LATENCY.observe(ended - ctx.invoke_started + phases['prefix'], command=command)
 
     async def process_commands(self, message: discord.Message) -> None:
         """Override process_commands to check, and call typing every invoke."""
@@ -430,6 +688,38 @@ class MetroBot(commands.AutoShardedBot):
             return commands.when_mentioned_or(*prefix, "")(bot, message) if not raw_prefix else prefix
         return commands.when_mentioned_or(*prefix)(bot, message) if not raw_prefix else prefix 
 
+    def _prefix_pattern(self, prefixes: tuple[str, ...]) -> re.Pattern:
+        pattern = self._prefix_patterns.get(prefixes)
+        if pattern is None:
+            # longest first so 'm.' does not shadow something like 'm.!'
+            options = sorted(prefixes, key=len, reverse=True)
+            pattern = re.compile('|'.join(map(re.escape, options)))
+            self._prefix_patterns[prefixes] = pattern
+        return pattern
+
+    async def is_command_invocation(self, message: discord.Message) -> bool:
+        """Whether a message starts with one of the bot's prefixes.
+
+        This is a cheap stand-in for ``(await bot.get_context(message)).prefix is not None``
+        for on_message listeners. The regex for every distinct prefix set is compiled once
+        and the result is memoized per message ID."""
+
+        try:
+            return self._command_invocations[message.id]
+        except KeyError:
+            pass
+
+        if check_dev(self, message.author) and self.noprefix is True:
+            result = True
+        else:
+            prefixes = (*await self.get_pre(self, message, raw_prefix=True), f'<@{self.user.id}> ', f'<@!{self.user.id}> ')
+            result = self._prefix_pattern(prefixes).match(message.content) is not None
+
+        if len(self._command_invocations) >= 1000:
+            del self._command_invocations[next(iter(self._command_invocations))]
+        self._command_invocations[message.id] = result
+        return result
+
     async def fetch_prefixes(self, guild_id: int):
         return tuple([x['prefix'] for x in
             await self.db.fetch('SELECT prefix from prefixes WHERE guild_id = $1', guild_id)]) or self.PRE
@@ -507,6 +797,8 @@ async def main():
         async with bot:
             bot.session = session
             bot.db = await create_db_pool(user, password, database, host, port)
+            await run_sql_migrations(bot.db, verbose=True)
+            await bot.load_cache_snapshot()
             bot.loop.create_task(bot.startup())
 
             bot.wf = waifuim.WaifuAioClient(session=session, appname='metrodiscordbot')
@@ -517,11 +809,7 @@ async def main():
 
             bot.owner = bot.get_user(BOT_OWNER_ID)
 
-            for file in os.listdir(cwd + "/cogs"):
-                if file.endswith(".py") and not file.startswith("_"):
-                    await bot.load_extension(f"cogs.{file[:-3]}")
-                if file in folders:
-                    await bot.load_extension(f"cogs.{file}")
+            await load_extensions(bot, Path(cwd), find_extensions(Path(cwd), folders))
 
             await bot.load_extension('jishaku') # jishaku
 
@@ -38,8 +38,21 @@ class configuration(commands.Cog, description='Configure the bot/server.'):
     def emoji(self) -> str:
         return '⚙️'
 
+    def dump_caches(self):
+        return {
+            'plonks': (('plonks',), list(self.ignored.items())),
+            'command config': (('command_config',), list(self.command_config.items()))
+        }
+
     async def load_plonks(self):
         await self.bot.wait_until_ready()
+
+        cached = await self.bot.restore_cache('plonks')
+        if cached is not None:
+            for server_id, entities in cached:
+                self.ignored[server_id].extend(entities)
+            return
+
         query = """
                 SELECT server_id, ARRAY_AGG(entity_id) AS entities
                 FROM plonks GROUP BY server_id;
@@ -53,6 +66,13 @@ class configuration(commands.Cog, description='Configure the bot/server.'):
 
     async def load_command_config(self):
         await self.bot.wait_until_ready()
+
+        cached = await self.bot.restore_cache('command config')
+        if cached is not None:
+            for entity_id, commands in cached:
+                self.command_config[entity_id].extend(commands)
+            return
+
         query = """
                 SELECT entity_id, ARRAY_AGG(command) AS commands
                 FROM command_config GROUP BY entity_id;
@@ -71,7 +71,7 @@ class core(commands.Cog, description="Core events."):
         if not ctx.guild:
             return True
 
-        if self.bot.premium_guilds.get(ctx.guild.id) or self.bot.premium_users.get(ctx.author.id):
+        if self.bot.premium.is_premium(ctx.author.id, ctx.guild.id):
             bucket = self.premium_cd.get_bucket(ctx.message)
         else:
             bucket = self.premium_cd.get_bucket(ctx.message)
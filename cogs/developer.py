@@ -30,7 +30,9 @@ from utils.pages import SimplePageSource, SimplePages
 from utils.pages import StopView
 from utils.useful import Embed
 from utils.json_loader import write_json
+from utils.logger import stop_logging
 from utils.formats import plural
+from utils.metrics import COMMAND_LATENCY, COMMAND_PHASE_LATENCY, COMMAND_PHASES
 import utils.fuzzy as fuzzy_
 
 if TYPE_CHECKING:
@@ -255,6 +257,53 @@ class developer(commands.Cog, description="Developer commands."):
 
         await menu.start()
 
+    @moderator.command(name='commandlatency', aliases=['cl'])
+    @is_support()
+    async def moderator_commandlatency(self, ctx: MyContext, limit: int = 10):
+        """View the slowest commands and where their time goes.
+
+        This is for the current session. (Since last restart)"""
+
+        commands_seen = {key[0] for key in COMMAND_LATENCY.values}
+        if not commands_seen:
+            return await ctx.send('No commands have been timed yet.')
+
+        def mean(histogram, **labels) -> float:
+            count = histogram.count(**labels)
+            return histogram.total(**labels) / count if count else 0.0
+
+        slowest = sorted(commands_seen, key=lambda command: mean(COMMAND_LATENCY, command=command), reverse=True)
+        entries = []
+        for command in slowest[:max(limit, 1)]:
+            average = mean(COMMAND_LATENCY, command=command)
+            p95 = COMMAND_LATENCY.quantile(0.95, command=command)
+            phases = [
+                (phase, mean(COMMAND_PHASE_LATENCY, command=command, phase=phase))
+                for phase in COMMAND_PHASES
+                if COMMAND_PHASE_LATENCY.count(command=command, phase=phase)
+            ]
+            breakdown = ', '.join(f'{phase} {value * 1000:.0f}ms' for phase, value in phases)
+            entries.append(
+                f'**{command}** {average * 1000:.0f}ms avg, p95 \u2264 {p95 * 1000:.0f}ms '
+                f'({COMMAND_LATENCY.count(command=command)} uses)\n{breakdown}'
+            )
+
+        phase_totals = {
+            phase: sum(data[-1] for key, data in COMMAND_PHASE_LATENCY.values.items() if key[1] == phase)
+            for phase in COMMAND_PHASES
+        }
+        overall = sum(phase_totals.values()) or 1
+        worst = sorted(phase_totals.items(), key=lambda item: item[1], reverse=True)
+
+        source = SimplePageSource(entries, per_page=5)
+        menu = SimplePages(source=source, ctx=ctx, compact=True)
+        menu.embed.title = f'Slowest {len(entries)} Commands'
+        menu.embed.add_field(
+            name='Time by phase',
+            value='\n'.join(f'{phase}: {total / overall:.0%}' for phase, total in worst)
+        )
+        await menu.start()
+
     @moderator.command(name='sync')
     @is_support()
     async def moderator_sync(
@@ -509,7 +558,7 @@ class developer(commands.Cog, description="Developer commands."):
                     """
             try:
                 await self.bot.db.execute(query, object.id, True, (discord.utils.utcnow()).replace(tzinfo=None))
-                self.bot.premium_guilds[object.id] = True
+                self.bot.premium.add_guild(object.id)
             except asyncpg.exceptions.UniqueViolationError:
                 raise commands.BadArgument(f"{self.bot.emotes['cross']} This guild already has premium perks!")
 
@@ -527,7 +576,7 @@ class developer(commands.Cog, description="Developer commands."):
                     DELETE FROM premium_guilds WHERE server = $1
                     """
             status = await self.bot.db.execute(query, object.id)
-            self.bot.premium_guilds[object.id] = False
+            self.bot.premium.remove_guild(object.id)
             if status == "DELETE 0":
                 raise commands.BadArgument(f"{self.bot.emotes['cross']} This guild doesn't even have premium perks.")
 
@@ -678,7 +727,19 @@ class developer(commands.Cog, description="Developer commands."):
         else:
             await ctx.send(fmt, view=StopView(ctx))
 
-    def do_restart(self, message: discord.Message) -> None:
+    async def do_restart(self, message: discord.Message) -> None:
+        utility_cog = self.bot.get_cog('utility')
+        if utility_cog:
+            # short timers only live in memory until they're flushed
+            await utility_cog.flush_short_timers()
+
+        stats_cog = self.bot.get_cog('stats')
+        if stats_cog:
+            await stats_cog.bulk_insert()
+
+        # taken last so nothing written above makes it look out of date
+        await self.bot.save_cache_snapshot()
+
         write_json(
             {
                 "id": message.id, 
@@ -686,6 +747,8 @@ class developer(commands.Cog, description="Developer commands."):
                 "now": ((discord.utils.utcnow()).replace(tzinfo=None)).timestamp()
             }, 
             'restart')
+        # exec skips atexit, so the queued log records have to be written now
+        stop_logging()
         restart_program()
 
     @commands.hybrid_command(name='restart', aliases=['reboot'])
@@ -694,7 +757,7 @@ class developer(commands.Cog, description="Developer commands."):
     async def restart(self, ctx: MyContext):
         """Restart the bot."""
         message = await ctx.send(f"Restarting...", reply=False)
-        self.do_restart(message)
+        await self.do_restart(message)
 
     @commands.hybrid_command(name='push')
     @app_commands.guilds(TESTING_GUILD)
@@ -722,5 +785,5 @@ class developer(commands.Cog, description="Developer commands."):
             await rall(ctx)
             return await ctx.send("Updated!")
              
-        self.do_restart(message)
+        await self.do_restart(message)
 
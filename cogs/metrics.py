@@ -0,0 +1,180 @@
+import time
+from typing import Any, Optional
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from bot import MetroBot
+from utils.custom_context import MyContext
+from utils.json_loader import read_json
+from utils.loop_monitor import LoopLagMonitor
+from utils.metrics import COMMAND_LATENCY, COMMAND_PHASE_LATENCY, COMMANDS, GATEWAY_EVENTS, MetricsServer, registry
+
+info_file = read_json('info')
+metrics_info: dict[str, Any] = info_file.get('metrics', {})
+
+async def setup(bot: MetroBot):
+    await bot.add_cog(metrics(bot))
+
+class metrics(commands.Cog, description='Process metrics for monitoring.'):
+    def __init__(self, bot: MetroBot):
+        self.bot = bot
+        self.server = MetricsServer(
+            host=metrics_info.get('host', '127.0.0.1'),
+            port=metrics_info.get('port', 9180)
+        )
+
+        self.loop_monitor = LoopLagMonitor(
+            threshold=metrics_info.get('loop_lag_threshold', 0.25),
+            on_stall=self.on_loop_stall
+        )
+        self._last_stall_report = 0.0
+
+        registry.gauge('metro_event_loop_max_lag_seconds', 'The longest event loop lag seen.', function=lambda: self.loop_monitor.max_lag)
+        registry.gauge(
+            'metro_db_pool_connections', 'Connections in the database pool.', ('state',),
+            function=self.collect_pool
+        )
+        registry.gauge(
+            'metro_cache_entries', 'Entries in the in-memory caches.', ('cache',),
+            function=self.collect_caches
+        )
+        registry.gauge(
+            'metro_timers', 'Timers by where they are in the pipeline.', ('state',),
+            function=self.collect_timers
+        )
+        registry.gauge('metro_guilds', 'Guilds the bot is in.', function=lambda: len(self.bot.guilds))
+        registry.gauge('metro_gateway_latency_seconds', 'Average websocket heartbeat latency.', function=self.collect_latency)
+
+    @property
+    def emoji(self) -> str:
+        return ''
+
+    async def cog_load(self) -> None:
+        self.loop_monitor.start()
+        if metrics_info.get('enabled', True) is False:
+            return
+
+        try:
+            await self.server.start()
+        except OSError as e:
+            self.bot.logger.warning(f'Could not start the metrics server: {e}')
+
+    async def cog_unload(self) -> None:
+        self.loop_monitor.stop()
+        await self.server.close()
+
+    # at most one stall is posted to the error webhook per this many seconds
+    STALL_REPORT_COOLDOWN = 60.0
+
+    def on_loop_stall(self, lag: float, stack: Optional[str]) -> None:
+        self.bot.logger.warning('Event loop stalled for %.3fs\n%s', lag, stack or 'No stack was captured.')
+
+        now = time.monotonic()
+        if now - self._last_stall_report < self.STALL_REPORT_COOLDOWN:
+            return
+        self._last_stall_report = now
+
+        hook = getattr(self.bot, 'error_logger', None)
+        if hook is None:
+            return
+
+        e = discord.Embed(title='Event Loop Stall', colour=0xA32952)
+        e.description = f'The event loop was blocked for **{lag * 1000:.0f}ms**.'
+        if stack:
+            # the innermost frames are at the end and matter the most
+            e.add_field(name='Loop thread stack', value=f'```py\n{stack[-950:]}\n```', inline=False)
+        e.timestamp = discord.utils.utcnow()
+        self.bot.loop.create_task(self.send_stall_report(hook, e))
+
+    async def send_stall_report(self, hook: discord.Webhook, embed: discord.Embed) -> None:
+        try:
+            await hook.send(embed=embed)
+        except discord.HTTPException:
+            pass
+
+    def collect_pool(self) -> dict[tuple[str, ...], float]:
+        pool = self.bot.db
+        if not pool:
+            return {}
+
+        size = pool.get_size()
+        idle = pool.get_idle_size()
+        return {
+            ('max',): pool.get_max_size(),
+            ('open',): size,
+            ('idle',): idle,
+            ('in_use',): size - idle,
+        }
+
+    def collect_caches(self) -> dict[tuple[str, ...], float]:
+        caches = {
+            ('prefixes',): len(self.bot.prefixes),
+            ('blacklist',): len(self.bot.blacklist),
+            ('guildblacklist',): len(self.bot.guildblacklist),
+            ('premium_users',): len(self.bot.premium.users),
+            ('premium_guilds',): len(self.bot.premium.guilds),
+            ('messages',): len(self.bot.cached_messages),
+        }
+
+        utility_cog = self.bot.get_cog('utility')
+        if utility_cog:
+            caches[('highlight',)] = len(utility_cog.highlight_cache)
+            caches[('highlight_ignored',)] = len(utility_cog.highlight_ignored)
+            caches[('recent_messages',)] = len(utility_cog.recent_messages)
+
+        serverutils_cog = self.bot.get_cog('serverutils')
+        if serverutils_cog:
+            caches[('afk',)] = len(serverutils_cog.afk_users)
+        return caches
+
+    def collect_timers(self) -> dict[tuple[str, ...], float]:
+        utility_cog = self.bot.get_cog('utility')
+        if not utility_cog:
+            return {}
+
+        return {(state,): count for state, count in utility_cog.timer_stats().items()}
+
+    def collect_latency(self) -> float:
+        latency = self.bot.latency
+        return latency if latency == latency else 0.0 # nan before the first heartbeat
+
+    def record_command(self, ctx: MyContext, *, failed: bool) -> None:
+        # latency of prefix commands is recorded by MetroBot.invoke
+        if ctx.command is None:
+            return
+
+        COMMANDS.inc(command=ctx.command.qualified_name, app_command=ctx.interaction is not None, failed=failed)
+
+    @commands.Cog.listener()
+    async def on_interaction(self, interaction: discord.Interaction):
+        if interaction.type is discord.InteractionType.application_command:
+            interaction.extras['metrics_started'] = time.perf_counter()
+
+    @commands.Cog.listener()
+    async def on_command_completion(self, ctx: MyContext):
+        self.record_command(ctx, failed=ctx.command_failed)
+
+    @commands.Cog.listener()
+    async def on_command_error(self, ctx: MyContext, error: commands.CommandError):
+        self.record_command(ctx, failed=True)
+
+    @commands.Cog.listener()
+    async def on_app_command_completion(self, interaction: discord.Interaction, command: app_commands.Command):
+        started: Optional[float] = interaction.extras.get('metrics_started')
+        if started is not None:
+            elapsed = time.perf_counter() - started
+            COMMAND_LATENCY.observe(elapsed, command=command.qualified_name)
+            # app commands don't go through the prefix pipeline, so it's all callback
+            COMMAND_PHASE_LATENCY.observe(elapsed, command=command.qualified_name, phase='callback')
+
+        # hybrid commands are already counted through on_command_completion
+        if isinstance(command, commands.hybrid.HybridAppCommand):
+            return
+
+        COMMANDS.inc(command=command.qualified_name, app_command=True, failed=interaction.command_failed)
+
+    @commands.Cog.listener()
+    async def on_socket_event_type(self, event_type: str):
+        GATEWAY_EVENTS.inc(type=event_type)
@@ -3,7 +3,6 @@ from typing import Dict, List, Union
 import discord
 from discord.ext import commands, menus
 import humanize
-import pytz
 import yarl
 from waifuim.types import Image
 
@@ -16,7 +15,7 @@ async def setup(bot: MetroBot):
 
 def nsfw_cooldown(ctx: MyContext):
     bot: MetroBot = ctx.bot
-    if bot.premium_users.get(ctx.author.id):
+    if bot.premium.is_premium_user(ctx.author.id):
         return commands.Cooldown(1, 2)
     return commands.Cooldown(1, 6)
 
@@ -50,7 +49,7 @@ class NSFW(commands.Cog, description='NSFW commands reserved for labeled channel
             embed.set_author(name='Command on cooldown!')
             embed.set_footer(text=f'Try again in {try_again}')
   
-            if not self.bot.premium_users.get(ctx.author.id):
+            if not self.bot.premium.is_premium_user(ctx.author.id):
                 embed.description = "You can vote for the bot to get reduced cooldowns.\n"\
                     f"> <{self.topgg}>\n"
 
@@ -95,17 +94,10 @@ class NSFW(commands.Cog, description='NSFW commands reserved for labeled channel
 
         await ctx.send(f'Created NSFW labeled channel. {channel.mention}')
 
-    async def has_voted(self, user_id: int) -> bool:
+    def has_voted(self, user_id: int) -> bool:
         """Check if a user_id has voted or not."""
 
-        query = "SELECT next_vote FROM votes WHERE user_id = $1"
-        returned = await self.bot.db.fetchval(query, user_id)
-        if not returned:
-            return False
-        next_vote = pytz.utc.localize(returned) + datetime.timedelta(hours=12)
-        if discord.utils.utcnow() > next_vote:
-            return False
-        return True
+        return self.bot.premium.is_premium_user(user_id)
         
     @commands.hybrid_group(name='waifu', invoke_without_command=True, fallback='commands')
     @commands.is_nsfw()
@@ -117,7 +109,7 @@ class NSFW(commands.Cog, description='NSFW commands reserved for labeled channel
     async def get_waifu_request(self, ctx: MyContext, tags: List[str]) -> Union[List[Image], Image, Dict]:
         images = await self.bot.wf.search(included_tags=tags, is_nsfw=True, many=True)
 
-        if not await self.has_voted(ctx.author.id):
+        if not self.has_voted(ctx.author.id):
             images = images[0:3]
             
         source = ImageSource(list(images), per_page=1)
@@ -175,7 +167,7 @@ class NSFW(commands.Cog, description='NSFW commands reserved for labeled channel
         vote_embed.description = 'You can vote to get reduced nsfw cooldowns, up to 30 pages for waifu and more.\n'\
             f'> <{self.topgg}>'
 
-        if self.bot.premium_users.get(ctx.author.id):
+        if self.bot.premium.is_premium_user(ctx.author.id):
             await ctx.send(embeds=[embed])
         else:
             await ctx.send(embeds=[embed, vote_embed])
@@ -22,9 +22,23 @@ class reactionroles(commands.Cog, description='Manage the reaction role system.'
     def emoji(self) -> str:
         return self.bot.emotes['role']
 
+    def dump_caches(self):
+        rows = [
+            (emoji, message_id, role_id)
+            for emoji, messages in self.reactionroles.items()
+            for message_id, role_id in messages.items()
+        ]
+        return {'reaction roles': (('reactionroles',), rows)}
+
     async def load_reactionroles(self):
         await self.bot.wait_until_ready()
 
+        cached = await self.bot.restore_cache('reaction roles')
+        if cached is not None:
+            for emoji, message_id, role_id in cached:
+                self.reactionroles.setdefault(emoji, {})[message_id] = role_id
+            return
+
         query = """
                 SELECT (emoji, message_id, role_id)
                 FROM reactionroles
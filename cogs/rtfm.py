@@ -146,6 +146,17 @@ class docs(commands.Cog, description="Fuzzy search through documentations."):
             'topgg.py': 'https://topggpy.readthedocs.io/en/stable/'
         }
 
+    async def cog_load(self) -> None:
+        # the lookup tables come from the network, so only the snapshot's age limits them
+        cached = await self.bot.restore_cache('rtfm')
+        if cached is not None and cached.keys() == self.page_types.keys():
+            self._rtfm_cache = cached
+
+    def dump_caches(self):
+        if not hasattr(self, '_rtfm_cache'):
+            return {}
+        return {'rtfm': ((), self._rtfm_cache)}
+
     @property
     def emoji(self) -> str:
         return '📚'
@@ -4,7 +4,6 @@ from discord import app_commands
 
 import datetime
 import io
-import json
 from typing import Optional, Union
 import re
 import pytz
@@ -738,13 +737,11 @@ class serverutils(commands.Cog, description='Server utilities like role, lockdow
                 f"I need to be able to send messages in {channel.mention}"
             )
 
-        query = """
-                SELECT (id)
-                FROM reminders
-                WHERE event = 'lockdown'
-                AND EXTRA->'kwargs'->>'channel_id' = $1; 
-                """
-        data = await self.bot.db.fetchval(query, str(channel.id))
+        reminder_cog: utility = self.bot.get_cog('utility')
+        if not reminder_cog:
+            raise commands.BadArgument(f'This feature is currently unavailable.')
+
+        data = await reminder_cog.find_timers('lockdown', channel_id=channel.id)
         if data:
             raise commands.BadArgument(f"{self.bot.cross} Channel {channel.mention} is already locked.")
         
@@ -753,10 +750,6 @@ class serverutils(commands.Cog, description='Server utilities like role, lockdow
         if perms is False:
             raise commands.BadArgument(f"{self.bot.cross} Channel {channel.mention} is already locked.")
 
-        reminder_cog = self.bot.get_cog('utility')
-        if not reminder_cog:
-            raise commands.BadArgument(f'This feature is currently unavailable.')
-
         message = await ctx.send(f'Locking {channel.mention} ...')
         bot_perms = channel.overwrites_for(ctx.guild.me)
         if not bot_perms.send_messages:
@@ -803,13 +796,11 @@ class serverutils(commands.Cog, description='Server utilities like role, lockdow
         """Lockdown the entire guild."""
         
         async with ctx.typing():
-            query = """
-                    SELECT (id, extra)
-                    FROM reminders
-                    WHERE event = 'serverlockdown'
-                    AND extra->'kwargs'->>'guild_id' = $1;
-                    """
-            data = await self.bot.db.fetchval(query, str(ctx.guild.id))
+            reminder_cog: utility = self.bot.get_cog("utility")
+            if not reminder_cog:
+                raise commands.BadArgument("This feature is currently unavailable.")
+
+            data = await reminder_cog.find_timers('serverlockdown', guild_id=ctx.guild.id)
             if data:
                 raise commands.BadArgument("The server is already locked.")
 
@@ -817,10 +808,6 @@ class serverutils(commands.Cog, description='Server utilities like role, lockdow
             if overwrites is False:
                 raise commands.BadArgument("This server is already locked.")
 
-            reminder_cog: utility = self.bot.get_cog("utility")
-            if not reminder_cog:
-                raise commands.BadArgument("This feature is currently unavailable.")
-
             message = await ctx.send("Locking the server...")
 
             perms = ctx.guild.default_role.permissions
@@ -871,14 +858,12 @@ class serverutils(commands.Cog, description='Server utilities like role, lockdow
                 f"I need to be able to send messages in {channel.mention}"
             )
 
-        query = """
-                SELECT (id, extra)
-                FROM reminders
-                WHERE event = 'lockdown'
-                AND extra->'kwargs'->>'channel_id' = $1;
-                """
-        s = await self.bot.db.fetchval(query, str(channel.id))
-        if not s:
+        reminder_cog: utility = self.bot.get_cog('utility')
+        if not reminder_cog:
+            raise commands.BadArgument('This feature is currently unavailable.')
+
+        timers = await reminder_cog.find_timers('lockdown', channel_id=channel.id)
+        if not timers:
             overwrites = channel.overwrites_for(ctx.guild.default_role)
             perms = overwrites.send_messages
             if perms is None:
@@ -889,17 +874,15 @@ class serverutils(commands.Cog, description='Server utilities like role, lockdow
             pass
            
         message = await ctx.send(f"Unlocking {channel.mention} ...")
-        if s:
-            task_id = s[0]
-            args_and_kwargs = json.loads(s[1])
-            perms = args_and_kwargs["kwargs"]["perms"]
-            
+        if timers:
+            task_id = timers[0].id
 
             query = """
                     DELETE FROM reminders
                     WHERE id = $1
                     """
             await self.bot.db.execute(query, task_id)
+            reminder_cog.cancel_timers(lambda timer: timer.id == task_id)
         reason = "Channel unlocked by command execution."
 
         overwrites = channel.overwrites_for(ctx.guild.default_role)
@@ -919,29 +902,27 @@ class serverutils(commands.Cog, description='Server utilities like role, lockdow
     async def unlockdown_server(self, ctx: MyContext):
         """Unlocked the entire guild."""
 
-        query = """
-                SELECT (id, extra)
-                FROM reminders
-                WHERE event = 'serverlockdown'
-                AND extra->'kwargs'->>'guild_id' = $1;
-                """
-        s = await self.bot.db.fetchval(query, str(ctx.guild.id))
-        if not s:
+        reminder_cog: utility = self.bot.get_cog('utility')
+        if not reminder_cog:
+            raise commands.BadArgument('This feature is currently unavailable.')
+
+        timers = await reminder_cog.find_timers('serverlockdown', guild_id=ctx.guild.id)
+        if not timers:
             if ctx.guild.default_role.permissions.send_messages:
                 raise commands.BadArgument("This server is already unlocked.")
             else:
                 pass
     
         message = await ctx.send("Unlocking...")
-        if s:
-            task_id = s[0]
-            args_and_kwargs = json.loads(s[1])
+        if timers:
+            task_id = timers[0].id
             
             query = """
                     DELETE FROM reminders
                     WHERE id = $1
                     """
             await self.bot.db.execute(query, task_id)
+            reminder_cog.cancel_timers(lambda timer: timer.id == task_id)
 
         perms = ctx.guild.default_role.permissions
         perms.update(send_messages=True)
@@ -12,6 +12,7 @@ from discord.ext import commands, tasks
 import pytz
 import topgg
 import datetime
+from collections import Counter
 from itertools import cycle
 
 from bot import MetroBot
@@ -33,12 +34,23 @@ info_file = read_json('info')
 topgg_token = info_file['topgg_token']
 vote_webhook_url = info_file['webhooks']['vote_webhook']
 guild_webhook_url = info_file['webhooks']['guild_webhook']
+# months of raw command usage to keep, 0 (the default) keeps everything
+commands_retention_months: int = info_file.get('commands_retention_months', 0)
 
 _INVITE_REGEX = re.compile(r'(?:https?:\/\/)?discord(?:\.gg|\.com|app\.com\/invite)?\/[A-Za-z0-9]+')
 
 def censor_invite(obj: Any, *, _regex=_INVITE_REGEX) -> str:
     return _regex.sub('[censored-invite]', str(obj))
 
+_PARTITION_REGEX = re.compile(r'commands_y(\d{4})m(\d{2})')
+
+def add_months(day: datetime.date, months: int) -> datetime.date:
+    month = day.month - 1 + months
+    return datetime.date(day.year + month // 12, month % 12 + 1, 1)
+
+def partition_name(month: datetime.date) -> str:
+    return f'commands_y{month:%Y}m{month:%m}'
+
 def ts_now(type: Optional[str] = 'f'):
     time =  discord.utils.format_dt(discord.utils.utcnow(), type)
     return time
@@ -84,7 +96,7 @@ class DataBatchEntry(TypedDict):
     guild: Optional[int]
     channel: int
     author: int
-    used: str
+    used: datetime.datetime
     prefix: str
     command: str
     failed: bool
@@ -104,6 +116,14 @@ class stats(commands.Cog, description='Bot statistics tracking related.'):
         self.top_gg = f"https://top.gg/bot/{BOT_ID}/vote"
         self.discordbotlist = f"https://discordbotlist.com/bots/{BOT_ID}"
 
+        self._batch_lock = asyncio.Lock()
+        self._write_lock = asyncio.Lock()
+        self._data_batch: list[DataBatchEntry] = []
+        self.bulk_insert_loop.add_exception_type(asyncpg.PostgresConnectionError)
+        self.bulk_insert_loop.start()
+        self.commands_partition_loop.add_exception_type(asyncpg.PostgresConnectionError)
+        self.commands_partition_loop.start()
+
         self.stats_loop.start()
         self.post_guild_loop.start()
         
@@ -114,6 +134,149 @@ class stats(commands.Cog, description='Bot statistics tracking related.'):
 
     def cog_unload(self) -> None:
         self.stats_loop.cancel()
+        self.commands_partition_loop.cancel()
+        # the loop flushes whatever is left once it stops
+        self.bulk_insert_loop.stop()
+
+    # flush the command batch early once it gets this big
+    BATCH_SIZE = 500
+    # entries kept around while the database can't be written to
+    MAX_BACKLOG = 20 * BATCH_SIZE
+
+    async def bulk_insert(self) -> None:
+        """Write the buffered command usage to the database with one COPY.
+
+        The buffer is only locked while it's swapped out, so commands keep
+        being recorded during the write. A batch that fails to write goes back
+        in front of the buffer, which keeps at most ``MAX_BACKLOG`` entries.
+        """
+
+        async with self._batch_lock:
+            if not self._data_batch:
+                return
+            batch, self._data_batch = self._data_batch, []
+
+        # one write at a time, concurrent upserts of the same rollups could deadlock
+        async with self._write_lock:
+            try:
+                await self.write_batch(batch)
+            except Exception:
+                self.bot.logger.exception(f'Failed to write {len(batch)} command usage rows')
+                async with self._batch_lock:
+                    self._data_batch[:0] = batch
+                    dropped = len(self._data_batch) - self.MAX_BACKLOG
+                    if dropped > 0:
+                        # the oldest entries go first
+                        del self._data_batch[:dropped]
+                        self.bot.logger.warning(f'Dropped {dropped} command usage rows, the backlog is full')
+
+    async def write_batch(self, batch: list[DataBatchEntry]) -> None:
+        records = [
+            (
+                entry['guild'], entry['channel'], entry['author'], entry['used'],
+                entry['prefix'], entry['command'], entry['failed'], entry['app_command']
+            )
+            for entry in batch
+        ]
+        # the daily rollups are updated in the same transaction as the raw rows
+        commands: Counter[tuple[int, datetime.date, str]] = Counter()
+        authors: Counter[tuple[int, datetime.date, int]] = Counter()
+        members: Counter[tuple[int, int, datetime.date, str]] = Counter()
+        first_used: dict[tuple[int, datetime.date, str], datetime.datetime] = {}
+        member_first_used: dict[tuple[int, int, datetime.date, str], datetime.datetime] = {}
+        for entry in batch:
+            guild_id = entry['guild'] or 0
+            day = entry['used'].date()
+            key = (guild_id, day, entry['command'])
+            commands[key] += 1
+            authors[(guild_id, day, entry['author'])] += 1
+            if key not in first_used or entry['used'] < first_used[key]:
+                first_used[key] = entry['used']
+
+            member_key = (guild_id, entry['author'], day, entry['command'])
+            members[member_key] += 1
+            if member_key not in member_first_used or entry['used'] < member_first_used[member_key]:
+                member_first_used[member_key] = entry['used']
+
+        command_rows = [(*key, uses, first_used[key]) for key, uses in commands.items()]
+        author_rows = [(*key, uses) for key, uses in authors.items()]
+        member_rows = [(*key, uses, member_first_used[key]) for key, uses in members.items()]
+
+        command_query = """INSERT INTO command_rollups (guild_id, day, command, uses, first_used)
+                           SELECT * FROM unnest($1::bigint[], $2::date[], $3::text[], $4::bigint[], $5::timestamp[])
+                           ON CONFLICT (guild_id, day, command) DO UPDATE
+                           SET uses = command_rollups.uses + EXCLUDED.uses,
+                               first_used = LEAST(command_rollups.first_used, EXCLUDED.first_used);
+                        """
+        author_query = """INSERT INTO command_author_rollups (guild_id, day, author_id, uses)
+                          SELECT * FROM unnest($1::bigint[], $2::date[], $3::bigint[], $4::bigint[])
+                          ON CONFLICT (guild_id, day, author_id) DO UPDATE
+                          SET uses = command_author_rollups.uses + EXCLUDED.uses;
+                       """
+        member_query = """INSERT INTO command_member_rollups (guild_id, author_id, day, command, uses, first_used)
+                          SELECT * FROM unnest($1::bigint[], $2::bigint[], $3::date[], $4::text[], $5::bigint[], $6::timestamp[])
+                          ON CONFLICT (guild_id, author_id, day, command) DO UPDATE
+                          SET uses = command_member_rollups.uses + EXCLUDED.uses,
+                              first_used = LEAST(command_member_rollups.first_used, EXCLUDED.first_used);
+                       """
+        async with self.bot.db.acquire() as con:
+            async with con.transaction():
+                await con.copy_records_to_table(
+                    'commands',
+                    records=records,
+                    columns=('guild_id', 'channel_id', 'author_id', 'used', 'prefix', 'command', 'failed', 'app_command')
+                )
+                await con.execute(command_query, *map(list, zip(*command_rows)))
+                await con.execute(author_query, *map(list, zip(*author_rows)))
+                await con.execute(member_query, *map(list, zip(*member_rows)))
+
+    @tasks.loop(hours=12)
+    async def commands_partition_loop(self):
+        """Create the upcoming monthly partitions of commands and drop expired ones.
+
+        Dropping a partition loses nothing from the server, global and member
+        stats since those read from the rollups, which are kept forever. Only
+        the raw rows, like the channel and prefix of each use, are gone.
+        """
+
+        this_month = discord.utils.utcnow().date().replace(day=1)
+        for offset in range(3):
+            start = add_months(this_month, offset)
+            query = f"""CREATE TABLE IF NOT EXISTS {partition_name(start)}
+                        PARTITION OF commands
+                        FOR VALUES FROM ('{start}') TO ('{add_months(start, 1)}');
+                     """
+            try:
+                await self.bot.db.execute(query)
+            except asyncpg.PostgresError:
+                self.bot.logger.exception(f'Failed to create partition {partition_name(start)}')
+
+        if commands_retention_months <= 0:
+            return
+
+        cutoff = add_months(this_month, -commands_retention_months)
+        query = """SELECT child.relname
+                   FROM pg_inherits
+                   JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+                   JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                   WHERE parent.relname = 'commands';
+                """
+        for record in await self.bot.db.fetch(query):
+            match = _PARTITION_REGEX.fullmatch(record['relname'])
+            if match is None:
+                continue # the default partition
+
+            if datetime.date(int(match[1]), int(match[2]), 1) < cutoff:
+                await self.bot.db.execute(f'DROP TABLE IF EXISTS {record["relname"]};')
+                self.bot.logger.info(f'Dropped expired command partition {record["relname"]}')
+
+    @tasks.loop(seconds=10.0)
+    async def bulk_insert_loop(self):
+        await self.bulk_insert()
+
+    @bulk_insert_loop.after_loop
+    async def after_bulk_insert_loop(self):
+        await self.bulk_insert()
 
     @tasks.loop(seconds=3*10)
     async def stats_loop(self):
@@ -159,6 +322,7 @@ class stats(commands.Cog, description='Bot statistics tracking related.'):
                     next_vote = $3
                 """
         await self.bot.db.execute(query, int(data.user), 1, next_vote)
+        self.bot.premium.add_user(int(data.user), pytz.utc.localize(next_vote))
 
         channel = self.bot.get_channel(VOTE_LOGS_CHANNEL)
         if not channel:
@@ -195,8 +359,6 @@ class stats(commands.Cog, description='Bot statistics tracking related.'):
         except discord.HTTPException:
             pass
 
-        self.bot.premium_users[int(data.user)] = True
-
     @commands.hybrid_command(name='vote')
     async def _vote(self, ctx: MyContext):
         """Get how to vote for the bot and gain premium perks."""
@@ -204,19 +366,13 @@ class stats(commands.Cog, description='Bot statistics tracking related.'):
         embed = discord.Embed(color=ctx.color)
         embed.set_author(name=str(self.bot.user), icon_url=self.bot.user.display_avatar.url)
 
-        query = "SELECT (next_vote) FROM votes WHERE user_id = $1"
-        rows = await self.bot.db.fetchval(query, ctx.author.id)
-
         value = f"[`CLICK HERE TO VOTE`]({self.top_gg})"
         view = None
-        if rows:
-            next_vote = pytz.utc.localize(rows)
-            if discord.utils.utcnow() > next_vote:
-                pass
-            else:
-                value = f"Next vote {discord.utils.format_dt(next_vote, 'R')} \n"\
-                    "> Click the button below to set a reminder."
-                view = VoteView(next_vote, ctx=ctx)
+        next_vote = self.bot.premium.user_expires(ctx.author.id)
+        if next_vote:
+            value = f"Next vote {discord.utils.format_dt(next_vote, 'R')} \n"\
+                "> Click the button below to set a reminder."
+            view = VoteView(next_vote, ctx=ctx)
 
         desc = "Voting on top.gg will grant you premium features for 12 hours. \n"\
                 f"**top.gg**: \n{value}\n\n"\
@@ -252,21 +408,27 @@ class stats(commands.Cog, description='Bot statistics tracking related.'):
         else:
             content = message.content
 
-        self.bot.logger.info(f'{message.created_at}: {message.author} in {destination}: {content}')
-        query = """
-                INSERT INTO commands (guild_id, channel_id, author_id, used, prefix, command, failed, app_command)
-                VALUES ($1, $2, $3, $4, $5, $6, $7, $8)
-                """
-        await self.bot.db.execute(
-            query, 
-            guild_id, 
-            ctx.channel.id, 
-            ctx.author.id, 
-            message.created_at.replace(tzinfo=None), 
-            ctx.prefix, 
-            command, 
-            ctx.command_failed, 
-            is_app_command)
+        self.bot.logger.info(
+            '%s: %s in %s: %s', message.created_at, message.author, destination, content,
+            extra={'command': command, 'guild_id': guild_id, 'author_id': ctx.author.id, 'app_command': is_app_command}
+        )
+        async with self._batch_lock:
+            self._data_batch.append(
+                {
+                    'guild': guild_id,
+                    'channel': ctx.channel.id,
+                    'author': ctx.author.id,
+                    'used': message.created_at.replace(tzinfo=None),
+                    'prefix': ctx.prefix,
+                    'command': command,
+                    'failed': ctx.command_failed,
+                    'app_command': is_app_command,
+                }
+            )
+            full = len(self._data_batch) >= self.BATCH_SIZE
+
+        if full:
+            await self.bulk_insert()
 
     @commands.Cog.listener()
     async def on_command_completion(self, ctx: MyContext):
@@ -340,9 +502,10 @@ class stats(commands.Cog, description='Bot statistics tracking related.'):
         )
 
         embed = discord.Embed(title='Server Command Stats', colour=discord.Colour.blurple())
+        today = discord.utils.utcnow().date()
 
         # total command uses
-        query = "SELECT COUNT(*), MIN(used) FROM commands WHERE guild_id=$1;"
+        query = "SELECT COALESCE(SUM(uses), 0)::bigint, MIN(first_used) FROM command_rollups WHERE guild_id=$1;"
         count: tuple[int, datetime.datetime] = await self.bot.db.fetchrow(query, ctx.guild.id)  # type: ignore
 
         embed.description = f'{count[0]} commands used.'
@@ -354,8 +517,8 @@ class stats(commands.Cog, description='Bot statistics tracking related.'):
         embed.set_footer(text='Tracking command usage since').timestamp = timestamp
 
         query = """SELECT command,
-                          COUNT(*) as "uses"
-                   FROM commands
+                          SUM(uses)::bigint as "uses"
+                   FROM command_rollups
                    WHERE guild_id=$1
                    GROUP BY command
                    ORDER BY "uses" DESC
@@ -371,17 +534,16 @@ class stats(commands.Cog, description='Bot statistics tracking related.'):
 
         embed.add_field(name='Top Commands', value=value, inline=True)
 
-        query = """SELECT command,
-                          COUNT(*) as "uses"
-                   FROM commands
+        # today is the current UTC day, not the last 24 hours
+        query = """SELECT command, uses
+                   FROM command_rollups
                    WHERE guild_id=$1
-                   AND used > (CURRENT_TIMESTAMP - INTERVAL '1 day')
-                   GROUP BY command
-                   ORDER BY "uses" DESC
+                   AND day=$2
+                   ORDER BY uses DESC
                    LIMIT 5;
                 """
 
-        records = await self.bot.db.fetch(query, ctx.guild.id)
+        records = await self.bot.db.fetch(query, ctx.guild.id, today)
 
         value = (
             '\n'.join(f'{lookup[index]}: {command} ({uses} uses)' for (index, (command, uses)) in enumerate(records))
@@ -391,8 +553,8 @@ class stats(commands.Cog, description='Bot statistics tracking related.'):
         embed.add_field(name='\u200b', value='\u200b', inline=True)
 
         query = """SELECT author_id,
-                          COUNT(*) AS "uses"
-                   FROM commands
+                          SUM(uses)::bigint AS "uses"
+                   FROM command_author_rollups
                    WHERE guild_id=$1
                    GROUP BY author_id
                    ORDER BY "uses" DESC
@@ -410,17 +572,15 @@ class stats(commands.Cog, description='Bot statistics tracking related.'):
 
         embed.add_field(name='Top Command Users', value=value, inline=True)
 
-        query = """SELECT author_id,
-                          COUNT(*) AS "uses"
-                   FROM commands
+        query = """SELECT author_id, uses
+                   FROM command_author_rollups
                    WHERE guild_id=$1
-                   AND used > (CURRENT_TIMESTAMP - INTERVAL '1 day')
-                   GROUP BY author_id
-                   ORDER BY "uses" DESC
+                   AND day=$2
+                   ORDER BY uses DESC
                    LIMIT 5;
                 """
 
-        records = await self.bot.db.fetch(query, ctx.guild.id)
+        records = await self.bot.db.fetch(query, ctx.guild.id, today)
 
         value = (
             '\n'.join(
@@ -445,7 +605,7 @@ class stats(commands.Cog, description='Bot statistics tracking related.'):
         embed.set_author(name=str(member), icon_url=member.display_avatar.url)
 
         # total command uses
-        query = "SELECT COUNT(*), MIN(used) FROM commands WHERE guild_id=$1 AND author_id=$2;"
+        query = "SELECT COALESCE(SUM(uses), 0)::bigint, MIN(first_used) FROM command_member_rollups WHERE guild_id=$1 AND author_id=$2;"
         count: tuple[int, datetime.datetime] = await self.bot.db.fetchrow(query, ctx.guild.id, member.id)  # type: ignore
 
         embed.description = f'{count[0]} commands used.'
@@ -457,8 +617,8 @@ class stats(commands.Cog, description='Bot statistics tracking related.'):
         embed.set_footer(text='First command used').timestamp = timestamp
 
         query = """SELECT command,
-                          COUNT(*) as "uses"
-                   FROM commands
+                          SUM(uses)::bigint as "uses"
+                   FROM command_member_rollups
                    WHERE guild_id=$1 AND author_id=$2
                    GROUP BY command
                    ORDER BY "uses" DESC
@@ -475,17 +635,16 @@ class stats(commands.Cog, description='Bot statistics tracking related.'):
         embed.add_field(name='Most Used Commands', value=value, inline=False)
 
         query = """SELECT command,
-                          COUNT(*) as "uses"
-                   FROM commands
+                          uses
+                   FROM command_member_rollups
                    WHERE guild_id=$1
                    AND author_id=$2
-                   AND used > (CURRENT_TIMESTAMP - INTERVAL '1 day')
-                   GROUP BY command
-                   ORDER BY "uses" DESC
+                   AND day = $3
+                   ORDER BY uses DESC
                    LIMIT 5;
                 """
 
-        records = await self.bot.db.fetch(query, ctx.guild.id, member.id)
+        records = await self.bot.db.fetch(query, ctx.guild.id, member.id, discord.utils.utcnow().date())
 
         value = (
             '\n'.join(f'{lookup[index]}: {command} ({uses} uses)' for (index, (command, uses)) in enumerate(records))
@@ -517,9 +676,9 @@ class stats(commands.Cog, description='Bot statistics tracking related.'):
     async def _stats_command_global(self, ctx: MyContext):
         """Global all time command statistics.
         
-        This is a support only command due to how resource demanding it is."""
+        This is a support only command."""
 
-        query = "SELECT COUNT(*) FROM commands;"
+        query = "SELECT COALESCE(SUM(uses), 0)::bigint FROM command_rollups;"
         total: tuple[int] = await self.bot.db.fetchrow(query)  # type: ignore
 
         e = discord.Embed(title='Command Stats', colour=discord.Colour.blurple())
@@ -533,8 +692,8 @@ class stats(commands.Cog, description='Bot statistics tracking related.'):
             '\N{SPORTS MEDAL}',
         )
 
-        query = """SELECT command, COUNT(*) AS "uses"
-                   FROM commands
+        query = """SELECT command, SUM(uses)::bigint AS "uses"
+                   FROM command_rollups
                    GROUP BY command
                    ORDER BY "uses" DESC
                    LIMIT 5;
@@ -544,8 +703,8 @@ class stats(commands.Cog, description='Bot statistics tracking related.'):
         value = '\n'.join(f'{lookup[index]}: {command} ({uses} uses)' for (index, (command, uses)) in enumerate(records))
         e.add_field(name='Top Commands', value=value, inline=False)
 
-        query = """SELECT guild_id, COUNT(*) AS "uses"
-                   FROM commands
+        query = """SELECT guild_id, SUM(uses)::bigint AS "uses"
+                   FROM command_rollups
                    GROUP BY guild_id
                    ORDER BY "uses" DESC
                    LIMIT 5;
@@ -554,7 +713,7 @@ class stats(commands.Cog, description='Bot statistics tracking related.'):
         records = await self.bot.db.fetch(query)
         value = []
         for (index, (guild_id, uses)) in enumerate(records):
-            if guild_id is None:
+            if guild_id == 0:
                 guild = 'Private Message'
             else:
                 guild = self.censor_object(self.bot.get_guild(guild_id) or f'<Unknown {guild_id}>')
@@ -564,8 +723,8 @@ class stats(commands.Cog, description='Bot statistics tracking related.'):
 
         e.add_field(name='Top Guilds', value='\n'.join(value), inline=False)
 
-        query = """SELECT author_id, COUNT(*) AS "uses"
-                   FROM commands
+        query = """SELECT author_id, SUM(uses)::bigint AS "uses"
+                   FROM command_author_rollups
                    GROUP BY author_id
                    ORDER BY "uses" DESC
                    LIMIT 5;
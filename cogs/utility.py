@@ -1,5 +1,5 @@
 import discord
-from discord.ext import commands, menus
+from discord.ext import commands, menus, tasks
 from discord import app_commands
 
 from typing import List, Optional, Union
@@ -10,9 +10,11 @@ import asyncio
 import datetime
 import time
 import os
+import socket
 import asyncpg
 import yarl
 import inspect
+import itertools
 import unicodedata
 import logging
 import re
@@ -23,6 +25,8 @@ from utils.pages import StopView
 from utils.embeds import create_embed
 from utils.json_loader import read_json
 from utils.custom_context import MyContext
+from utils.highlight import HighlightHit, HighlightMatcher, HighlightQueue, MessageSnippet, RecentMessages
+from utils.timers import TimerExecutor, TimerHeap, claim_timers, delete_claimed_timer, release_timer, renew_leases
 from utils.remind_utils import human_timedelta
 from utils.useful import Embed, dynamic_cooldown
 from utils.useful import Embed
@@ -57,10 +61,13 @@ class UnignoreSelect(discord.ui.Select):
     async def callback(self, interaction: discord.Interaction):
         await interaction.response.defer()
 
+        cog: utility = self.bot.get_cog('utility')
         to_join: list[Union[discord.TextChannel, discord.User]] = []
         for item in self.values:   
             await self.bot.db.execute('DELETE FROM highlight_ignored WHERE (user_id, guild_id, entity_id) = ($1, $2, $3)',
             self.ctx.author.id, self.ctx.guild.id, int(item))
+            if cog:
+                cog.unignore_highlight_entity(self.ctx.guild.id, self.ctx.author.id, int(item))
         
             object = self.bot.get_channel(int(item)) or self.bot.get_user(int(item))
             to_join.append(object)
@@ -153,16 +160,12 @@ class HighlightIgnoreUnignoreView(discord.ui.View):
 
         await interaction.response.defer()
 
-        blocked = self.user_select.values + self.channel_select.values
-        for user in blocked:
-            # for ux reasons I feel like this is the best option
-            # to do this task and is better to take this inefficiency
+        cog: utility = self.bot.get_cog('utility')
+        ignored = cog.highlight_ignored.get((interaction.guild_id, interaction.user.id), set()) if cog else set()
 
-            returned = await self.bot.db.fetchval(
-                'SELECT 1 FROM highlight_ignored WHERE user_id = $1 AND guild_id = $2 AND entity_id = $3',
-                interaction.user.id, interaction.guild_id, user.id)
-            
-            if returned:
+        blocked = self.user_select.values + self.channel_select.values
+        for user in list(blocked):
+            if user.id in ignored:
                 blocked.remove(user)
                 continue
 
@@ -175,6 +178,9 @@ class HighlightIgnoreUnignoreView(discord.ui.View):
                 logging.error('Error in highlight ignore unignore view.')
                 return 
 
+            if cog:
+                cog.ignore_highlight_entity(interaction.guild_id, interaction.user.id, user.id)
+
         joined = '\n'.join(map(lambda x: x.mention, blocked))
         if not joined:
             await interaction.followup.send('Select some users/channels before confirming.', ephemeral=True)
@@ -390,6 +396,20 @@ class Timer:
         self.created_at = record["created"]
         self.expires = record["expires"]
 
+    @classmethod
+    def from_record(cls, record):
+        extra = record["extra"]
+        if type(extra) is not dict:
+            extra = json.loads(extra)
+        pseudo = {
+            "id": record["id"],
+            "extra": extra,
+            "event": record["event"],
+            "created": record["created"],
+            "expires": record["expires"],
+        }
+        return cls(record=pseudo)
+
     @classmethod
     def temporary(cls, *, expires, created, event, args, kwargs):
         pseudo = {
@@ -471,11 +491,47 @@ class utility(commands.Cog, description="Get utilities like prefixes, serverinfo
     def __init__(self, bot : MetroBot):
         self.bot = bot
         self._req_lock = asyncio.Lock()
-        self._have_data = asyncio.Event()
-        self._current_timer = None
+        self._timers = TimerHeap()
+        self._timers_until: Optional[datetime.datetime] = None
+        self._timers_changed = asyncio.Event()
+        self.timer_executor = TimerExecutor(
+            bot,
+            limits={'new_giveaway': 3, 'temprole': 5},
+            # lockdowns edit every channel and most listeners wait for the bot to be ready
+            timeouts={
+                'new_giveaway': 300.0,
+                'temprole': None,
+                'reminder': None,
+                'bumpreminder': None,
+                'lockdown': None,
+                'serverlockdown': None
+            }
+        )
+        # identifies this process when claiming timers, see call_timers
+        self.timer_owner = f'{socket.gethostname()}:{os.getpid()}:{id(self):x}'
+        self._claimed_timers: dict[int, Timer] = {}
+        self._next_sweep = datetime.datetime.utcnow()
         self._task = bot.loop.create_task(self.dispatch_timers())
+        self.renew_timer_leases.add_exception_type(asyncpg.PostgresConnectionError)
+        self.renew_timer_leases.start()
+
+        # short timers live and fire in memory, the database only gets a shadow copy
+        self._short_timers = TimerHeap()
+        self._short_timers_changed = asyncio.Event()
+        self._short_timer_ids = itertools.count(-1, -1)
+        self._short_timer_rows: dict[int, int] = {}
+        self._fired_short_rows: list[int] = []
+        self._short_task = bot.loop.create_task(self.dispatch_short_timers())
+        if info_file.get('shadow_short_timers', False):
+            self.shadow_short_timers.add_exception_type(asyncpg.PostgresConnectionError)
+            self.shadow_short_timers.start()
 
         self.highlight_cache: dict[tuple[int, int], list[str]] = {}
+        self.highlight_matchers: dict[int, HighlightMatcher] = {}
+        self.highlight_ignored: dict[tuple[int, int], set[int]] = {}
+        self.highlight_queue = HighlightQueue(self.send_highlight)
+        self.recent_messages = RecentMessages()
+        self.highlight_queue.start()
 
         self.regex_pattern = re.compile('([^\s\w]|_)+')
         self.website_regex = re.compile("https?:\/\/[^\s]*")
@@ -483,13 +539,72 @@ class utility(commands.Cog, description="Get utilities like prefixes, serverinfo
         self.last_seen = {}
 
 
-    def cog_unload(self):
+    async def cog_unload(self):
         self._task.cancel()
+        self.renew_timer_leases.cancel()
+        self._short_task.cancel()
+        self.shadow_short_timers.cancel()
+        self.highlight_queue.close()
+        await self.flush_short_timers()
 
     @property
     def emoji(self) -> str:
         return 'ℹ️'
 
+    def add_highlight(self, guild_id: int, user_id: int, word: str) -> None:
+        """Add a word to the highlight cache and the guild's matcher."""
+
+        words = self.highlight_cache.setdefault((guild_id, user_id), [])
+        if word in words:
+            return
+        words.append(word)
+
+        matcher = self.highlight_matchers.get(guild_id)
+        if matcher is None:
+            matcher = self.highlight_matchers[guild_id] = HighlightMatcher()
+        matcher.add(word, user_id)
+
+    def remove_highlight(self, guild_id: int, user_id: int, word: str) -> None:
+        """Remove a word from the highlight cache and the guild's matcher."""
+
+        words = self.highlight_cache.get((guild_id, user_id))
+        if not words or word not in words:
+            return
+        words.remove(word)
+        if not words:
+            del self.highlight_cache[(guild_id, user_id)]
+
+        # the matcher lowercases words, so another casing of this one may still need it
+        if words and word.lower() in (other.lower() for other in words):
+            return
+
+        matcher = self.highlight_matchers.get(guild_id)
+        if matcher is not None:
+            matcher.remove(word, user_id)
+            if not matcher:
+                del self.highlight_matchers[guild_id]
+
+    def clear_highlights(self, guild_id: int, user_id: int) -> None:
+        """Remove every highlight a user has in a guild from the cache."""
+
+        for word in list(self.highlight_cache.get((guild_id, user_id), [])):
+            self.remove_highlight(guild_id, user_id, word)
+
+    def ignore_highlight_entity(self, guild_id: int, user_id: int, entity_id: int) -> None:
+        """Add a user/channel to someone's cached highlight ignore list."""
+
+        self.highlight_ignored.setdefault((guild_id, user_id), set()).add(entity_id)
+
+    def unignore_highlight_entity(self, guild_id: int, user_id: int, entity_id: int) -> None:
+        """Remove a user/channel from someone's cached highlight ignore list."""
+
+        ignored = self.highlight_ignored.get((guild_id, user_id))
+        if ignored is None:
+            return
+        ignored.discard(entity_id)
+        if not ignored:
+            del self.highlight_ignored[(guild_id, user_id)]
+
     async def from_permission(self, permission : int) -> CustomPermissions:
 
         allowed, denied = [], []
@@ -859,77 +974,320 @@ class utility(commands.Cog, description="Get utilities like prefixes, serverinfo
         except discord.Forbidden:
             await ctx.send("Oops! I couldn't send you a message. Are you sure your DMs are on?")
 
-    async def get_active_timer(self, *, connection=None, days=7):
-        query = "SELECT * FROM reminders WHERE expires < (CURRENT_DATE + $1::interval) ORDER BY expires LIMIT 1;"
+    # how far ahead timers are loaded from the database into memory
+    TIMER_WINDOW = timedelta(hours=6)
+
+    async def load_timers(self, *, connection=None) -> None:
+        """Load every timer expiring within the next window into memory."""
+
+        # move the window first so timers created while this is loading get queued
+        until = self._timers_until = datetime.datetime.utcnow() + self.TIMER_WINDOW
+        # shadows of this process' short timers fire from memory
+        query = """SELECT * FROM reminders
+                   WHERE expires < $1 AND claimed_by IS DISTINCT FROM $2
+                   ORDER BY expires;
+                """
         con = connection or self.bot.db
 
-        record = await con.fetchrow(query, timedelta(days=days))
-        if record:
-            if type(record["extra"]) is dict:
-                extra = record["extra"]
-            else:
-                extra = json.loads(record["extra"])
-            record_dict = {
-                "id": record["id"],
-                "extra": extra,
-                "event": record["event"],
-                "created": record["created"],
-                "expires": record["expires"],
-            }
-        return Timer(record=record_dict) if record else None
+        records = await con.fetch(query, until, self.timer_owner)
+        for record in records:
+            self._timers.push(Timer.from_record(record))
+
+    def queue_timer(self, timer: Timer) -> None:
+        """Hand a timer that was just written to the database to the dispatcher."""
+
+        if self._timers_until is None or timer.expires >= self._timers_until:
+            return # it'll be picked up when its window gets loaded
+
+        earliest = self._timers.peek()
+        self._timers.push(timer)
+        if earliest is None or timer.expires < earliest.expires:
+            self._timers_changed.set()
+
+    def cancel_timers(self, predicate) -> int:
+        """Drop queued timers matching ``predicate`` after their rows were deleted."""
+
+        count = self._timers.discard(predicate)
+        if count:
+            self._timers_changed.set()
+
+        short = [timer.id for timer in self._short_timers if predicate(timer)]
+        for timer_id in short:
+            self._short_timers.remove(timer_id)
+            self._short_timer_rows.pop(timer_id, None)
+        if short:
+            self._short_timers_changed.set()
+        return count + len(short)
+
+    # timers this close to expiring are fired along with the ones that are due
+    TIMER_EPSILON = timedelta(milliseconds=500)
+    # how long a claimed timer belongs to this process without a heartbeat
+    TIMER_LEASE = timedelta(seconds=90)
+    # the most timers claimed by a single query
+    TIMER_BATCH = 100
+
+    async def call_timers(self, until: datetime.datetime) -> list[Timer]:
+        """Claim and dispatch every timer expiring before ``until``.
+
+        Rows are leased rather than deleted so that several bot processes can
+        share the table: ``SKIP LOCKED`` keeps them from claiming the same rows,
+        and a row whose lease ran out because its owner died is claimed again
+        by whoever sweeps next. Rows are deleted once their listeners finish.
+        """
 
-    async def wait_for_active_timers(self, *, connection=None, days=7):
+        while (timer := self._timers.peek()) is not None and timer.expires <= until:
+            self._timers.pop()
 
-        timer = await self.get_active_timer(connection=connection, days=days)
-        
-        if timer is not None:
-            self._have_data.set()
-            return timer
+        now = datetime.datetime.utcnow()
+        self._next_sweep = now + self.TIMER_LEASE
+        records = await claim_timers(
+            self.bot.db, self.timer_owner, until=until, now=now, lease=self.TIMER_LEASE, limit=self.TIMER_BATCH
+        )
+        timers = [Timer.from_record(record) for record in records]
+        if len(timers) == self.TIMER_BATCH:
+            self._next_sweep = now # there's more waiting
+
+        # dispatch the events
+        for timer in timers:
+            self._timers.remove(timer.id)
+            if timer.id in self._claimed_timers:
+                continue # its lease lapsed while the listeners were still running
+            self._claimed_timers[timer.id] = timer
+            self.timer_executor.submit(timer, done=self.finish_timer)
+        return timers
+
+    def timer_stats(self) -> dict[str, int]:
+        """How many timers are at each step between being loaded and finishing."""
+
+        return {
+            'queued': len(self._timers),
+            'short': len(self._short_timers),
+            'claimed': len(self._claimed_timers),
+            'waiting': self.timer_executor.queue_depth,
+            'running': sum(self.timer_executor.running.values()),
+        }
 
-        self._have_data.clear()
-        self._current_timer = None
-        await self._have_data.wait()
-        return await self.get_active_timer(connection=connection, days=days)
+    # how long a timer whose listeners timed out waits before it's claimed again
+    TIMER_RETRY_DELAY = timedelta(minutes=5)
 
-    async def call_timer(self, timer):
-        
-        # delete the timer
-        query = "DELETE FROM reminders WHERE id=$1;"
-        await self.bot.db.execute(query, timer.id)
+    async def finish_timer(self, timer: Timer, finished: bool) -> None:
+        """Delete a claimed timer after its listeners ran.
+
+        A timer whose listeners timed out or were cancelled keeps its row and
+        loses its lease, so it fires again after ``TIMER_RETRY_DELAY``.
+        """
+
+        self._claimed_timers.pop(timer.id, None)
+        if finished:
+            await delete_claimed_timer(self.bot.db, timer.id, self.timer_owner)
+            return
 
-        # dispatch the event
-        event_name = f"{timer.event}_timer_complete"
-        self.bot.dispatch(event_name, timer)
+        retry_at = datetime.datetime.utcnow() + self.TIMER_RETRY_DELAY
+        await release_timer(self.bot.db, timer.id, self.timer_owner, retry_at=retry_at)
+        self.bot.logger.warning(f'Timer {timer.id} ({timer.event}) did not finish, retrying it at {retry_at}')
+
+    @tasks.loop(seconds=30)
+    async def renew_timer_leases(self):
+        """Keep the leases of timers whose listeners are still running."""
+
+        if not self._claimed_timers:
+            return
+
+        expires = datetime.datetime.utcnow() + self.TIMER_LEASE
+        await renew_leases(self.bot.db, self.timer_owner, list(self._claimed_timers), expires=expires)
 
     async def dispatch_timers(self):
 
         try:            
             while not self.bot.is_closed():
-                
-                # can only asyncio.sleep for up to ~48 days reliably
-                # so we're gonna cap it off at 40 days
-                # see: http://bugs.python.org/issue20493
-                timer = self._current_timer = await self.wait_for_active_timers(days=40)
-                
                 now = datetime.datetime.utcnow()
-                if timer.expires >= now:
-                    to_sleep = (timer.expires - now).total_seconds()
-                    await asyncio.sleep(to_sleep)
-
-                await self.call_timer(timer)
+                if self._timers_until is None or now >= self._timers_until:
+                    await self.load_timers()
+
+                # timers other processes failed to finish are only found by sweeping
+                timer = self._timers.peek()
+                wake_at = min(self._timers_until, self._next_sweep)
+                if timer is not None:
+                    wake_at = min(wake_at, timer.expires)
+
+                if wake_at > now:
+                    self._timers_changed.clear()
+                    try:
+                        await asyncio.wait_for(self._timers_changed.wait(), (wake_at - now).total_seconds())
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+
+                await self.call_timers(now + self.TIMER_EPSILON)
         except asyncio.CancelledError:
             raise
         except (OSError, discord.ConnectionClosed, asyncpg.PostgresConnectionError):
+            self._timers_until = None
             self._task.cancel()
             self._task = self.bot.loop.create_task(self.dispatch_timers())
         except Exception as e:
             raise e
 
-    async def short_timer_optimisation(self, seconds, timer):
-        await asyncio.sleep(seconds)
-        event_name = f"{timer.event}_timer_complete"
-        self.bot.dispatch(event_name, timer)
+    # timers this short skip the database and are fired from memory
+    SHORT_TIMER_THRESHOLD = 30
+    # short timers with at least this long left get a shadow row, when shadowing is on
+    SHORT_TIMER_SHADOW_AFTER = timedelta(seconds=5)
+
+    def queue_short_timer(self, timer: Timer) -> None:
+        timer.id = next(self._short_timer_ids) # a placeholder, short timers have no row
+        earliest = self._short_timers.peek()
+        self._short_timers.push(timer)
+        if earliest is None or timer.expires < earliest.expires:
+            self._short_timers_changed.set()
+
+    async def dispatch_short_timers(self):
+        """Fire in-memory short timers from a single task."""
+
+        while True:
+            timer = self._short_timers.peek()
+            delay = None if timer is None else (timer.expires - datetime.datetime.utcnow()).total_seconds()
+            if delay is None or delay > 0:
+                self._short_timers_changed.clear()
+                try:
+                    await asyncio.wait_for(self._short_timers_changed.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
 
+            self._short_timers.pop()
+            row_id = self._short_timer_rows.pop(timer.id, None)
+            if row_id is not None:
+                self._fired_short_rows.append(row_id)
+            timer.id = None
+            self.timer_executor.submit(timer)
+
+    async def _insert_timers(self, con, timers: list[Timer], *, owner: Optional[str] = None) -> list[int]:
+        """Write timers with one batch, leased to ``owner`` until they're due if given."""
+
+        ids = [row[0] for row in await con.fetch("SELECT nextval('reminders_id_seq') FROM generate_series(1, $1);", len(timers))]
+        query = """INSERT INTO reminders (id, event, extra, expires, created, guild_id, channel_id, message_id, claimed_by, lease_expires)
+                   VALUES ($1, $2, $3::jsonb, $4, $5, $6, $7, $8, $9, $10);
+                """
+        await con.executemany(query, [
+            (row_id, *self._timer_row(timer), owner, timer.expires + self.TIMER_LEASE if owner else None)
+            for row_id, timer in zip(ids, timers)
+        ])
+        return ids
+
+    async def delete_fired_short_timers(self, *, connection=None) -> None:
+        """Delete the shadow rows of short timers that already fired, in one query."""
+
+        if not self._fired_short_rows:
+            return
+
+        rows, self._fired_short_rows = self._fired_short_rows, []
+        query = "DELETE FROM reminders WHERE id = ANY($1::bigint[]) AND claimed_by = $2;"
+        try:
+            await (connection or self.bot.db).execute(query, rows, self.timer_owner)
+        except Exception:
+            self._fired_short_rows.extend(rows)
+            raise
+
+    @tasks.loop(seconds=5)
+    async def shadow_short_timers(self):
+        """Keep a copy of pending short timers in the database.
+
+        Only runs when ``shadow_short_timers`` is set in the config. The rows
+        are leased to this process until the timer is due, so nothing else
+        fires them unless this process dies first, and they're deleted in
+        batches once they fired from memory.
+        """
+
+        await self.delete_fired_short_timers()
+
+        cutoff = datetime.datetime.utcnow() + self.SHORT_TIMER_SHADOW_AFTER
+        timers = [
+            timer for timer in self._short_timers
+            if timer.id not in self._short_timer_rows and timer.expires > cutoff
+        ]
+        if not timers:
+            return
+
+        ids = await self._insert_timers(self.bot.db, timers, owner=self.timer_owner)
+        for row_id, timer in zip(ids, timers):
+            if timer.id in self._short_timers:
+                self._short_timer_rows[timer.id] = row_id
+            else:
+                # it fired or was cancelled while the rows were written
+                self._fired_short_rows.append(row_id)
+
+    async def flush_short_timers(self) -> int:
+        """Hand every pending short timer over to the database before shutting down.
+
+        Timers without a shadow row get one, shadow rows are released from
+        this process' lease, and both are left for the regular dispatcher.
+        """
+
+        await self.delete_fired_short_timers()
+
+        timers = list(self._short_timers)
+        if not timers:
+            return 0
+        self._short_timers.clear()
+
+        shadowed = [timer for timer in timers if timer.id in self._short_timer_rows]
+        unshadowed = [timer for timer in timers if timer.id not in self._short_timer_rows]
+        try:
+            async with self.bot.db.acquire() as con:
+                async with con.transaction():
+                    if shadowed:
+                        query = """UPDATE reminders SET claimed_by = NULL, lease_expires = NULL
+                                   WHERE id = ANY($1::bigint[]) AND claimed_by = $2;
+                                """
+                        await con.execute(query, [self._short_timer_rows[timer.id] for timer in shadowed], self.timer_owner)
+                    ids = await self._insert_timers(con, unshadowed) if unshadowed else []
+        except Exception:
+            for timer in timers:
+                self._short_timers.push(timer)
+            self._short_timers_changed.set()
+            raise
+
+        for row_id, timer in zip(ids, unshadowed):
+            self._short_timer_rows[timer.id] = row_id
+
+        # after a reload the timers belong to the new instance of the cog
+        cog = self.bot.get_cog('utility') or self
+        for timer in timers:
+            timer.id = self._short_timer_rows.pop(timer.id)
+            cog.queue_timer(timer)
+        return len(timers)
+
+    def _timer_row(self, timer: Timer) -> tuple:
+        jsonb = json.dumps({"args": timer.args, "kwargs": timer.kwargs}, default=str)
+        lookup = [timer.kwargs.get(key) for key in self.TIMER_LOOKUP_KEYS]
+        return (timer.event, jsonb, timer.expires, timer.created_at, *lookup)
+
+
+    # keyword arguments of create_timer that get their own indexed column
+    TIMER_LOOKUP_KEYS = ('guild_id', 'channel_id', 'message_id')
+
+    async def find_timers(self, event: str, *, connection=None, **keys: int) -> list[Timer]:
+        """Find pending timers of ``event`` by their lookup keys.
+
+        Only the keys in ``TIMER_LOOKUP_KEYS`` can be searched, and only
+        timers that were created with them as keyword arguments are found.
+        Timers that are firing right now are not pending anymore and are skipped.
+        """
+
+        unknown = keys.keys() - set(self.TIMER_LOOKUP_KEYS)
+        if unknown:
+            raise TypeError(f'Timers cannot be looked up by {", ".join(sorted(unknown))}')
+
+        # the column names come from TIMER_LOOKUP_KEYS, never from user input
+        conditions = ' '.join(f'AND {key} = ${index}' for index, key in enumerate(keys, start=2))
+        query = f"""SELECT * FROM reminders
+                    WHERE event = $1 {conditions}
+                    AND (lease_expires IS NULL OR lease_expires < (NOW() AT TIME ZONE 'utc'))
+                    ORDER BY expires;
+                 """
+        con = connection or self.bot.db
+        records = await con.fetch(query, event, *keys.values())
+        return [Timer.from_record(record) for record in records]
 
     async def create_timer(self, *args, **kwargs):
         """Creates a timer.
@@ -953,6 +1311,8 @@ class utility(commands.Cog, description="Get utilities like prefixes, serverinfo
         Note
         ------
         Arguments and keyword arguments must be JSON serialisable.
+        Keyword arguments named in ``TIMER_LOOKUP_KEYS`` are also stored in
+        their own indexed columns so they can be searched with :meth:`find_timers`.
         Returns
         --------
         :class:`Timer`
@@ -981,40 +1341,20 @@ class utility(commands.Cog, description="Get utilities like prefixes, serverinfo
 
         blacklist = ['giveaway', 'new_giveaway']
         if event not in blacklist:
-            if delta <= 30:
+            if delta <= self.SHORT_TIMER_THRESHOLD:
                 # a shortcut for small timers
-                self.bot.loop.create_task(self.short_timer_optimisation(delta, timer))
+                self.queue_short_timer(timer)
                 return timer
 
-        next_id_query = """SELECT MAX(id) FROM reminders;"""
-        id = await connection.fetch(next_id_query)
-
-        if id[0].get('max') is None:
-            id = 1
-        else:
-            id = int(id[0].get('max')) + 1
-
-
-        query = """INSERT INTO reminders (id, event, extra, expires, created)
-                   VALUES ($1, $2, $3::jsonb, $4, $5)
+        query = """INSERT INTO reminders (event, extra, expires, created, guild_id, channel_id, message_id)
+                   VALUES ($1, $2::jsonb, $3, $4, $5, $6, $7)
                    RETURNING id;
                 """
 
-        jsonb = json.dumps({"args": args, "kwargs": kwargs}, default=str)
-
-        row = await connection.fetchrow(query, id, event, jsonb, when, now)
+        row = await connection.fetchrow(query, *self._timer_row(timer))
         timer.id = row[0]
 
-        # only set the data check if it can be waited on
-        if delta <= (86400 * 40): # 40 days
-            self._have_data.set()
-
-        # check if this timer is earlier than our currently run timer
-        if self._current_timer and when < self._current_timer.expires:
-            # cancel the task and re-run it
-            self._task.cancel()
-            self._task = self.bot.loop.create_task(self.dispatch_timers())
-
+        self.queue_timer(timer)
         return timer
 
     @commands.hybrid_group(aliases=['remind','rm'], usage="<when>", invoke_without_command=True, fallback='create')
@@ -1099,11 +1439,7 @@ class utility(commands.Cog, description="Get utilities like prefixes, serverinfo
         if status == "DELETE 0":
             return await ctx.send('Could not delete any reminders with that ID')
 
-        # if the current timer is being deleted
-        if self._current_timer and self._current_timer.id == id:
-            # cancel the task and re-run it
-            self._task.cancel()
-            self._task = self.bot.loop.create_task(self.dispatch_timers())
+        self.cancel_timers(lambda timer: timer.id == id)
 
         await ctx.send("Successfully deleted reminder.")
 
@@ -1141,9 +1477,7 @@ class utility(commands.Cog, description="Get utilities like prefixes, serverinfo
 
         await self.bot.db.execute(query, author_id)
 
-        if self._current_timer and self._current_timer.author_id == ctx.author.id:
-            self._task.cancel()
-            self._task = self.bot.loop.create_task(self.dispatch_timers())
+        self.cancel_timers(lambda timer: timer.event == 'reminder' and timer.author_id == ctx.author.id)
 
         await confirm.message.edit(content=f'Successfully deleted **{total}** reminder(s)', view=None)
         
@@ -1241,10 +1575,7 @@ class utility(commands.Cog, description="Get utilities like prefixes, serverinfo
         data = await self.bot.db.fetchval("SELECT highlight FROM highlight WHERE author_id = $1 AND guild_id = $2 AND text = $3", ctx.author.id, ctx.guild.id, word)
         if not data:  
             await self.bot.db.execute("INSERT INTO highlight (author_id, text, guild_id) VALUES ($1, $2, $3)", ctx.author.id, word, ctx.guild.id)
-            if self.highlight_cache.get((ctx.guild.id, ctx.author.id)):
-                self.highlight_cache[(ctx.guild.id, ctx.author.id)].append(word)
-            else:
-                self.highlight_cache[(ctx.guild.id, ctx.author.id)] = [word]
+            self.add_highlight(ctx.guild.id, ctx.author.id, word)
 
         await ctx.send(f"{self.bot.emotes['check']} Updated your highlight list.", hide=True, delete_after=6)
         try:
@@ -1261,11 +1592,8 @@ class utility(commands.Cog, description="Get utilities like prefixes, serverinfo
         word = word.lower()
         
         await self.bot.db.execute("DELETE FROM highlight WHERE author_id = $1 AND text = $2 AND guild_id = $3", ctx.author.id, word, ctx.guild.id)
+        self.remove_highlight(ctx.guild.id, ctx.author.id, word)
 
-        try:
-            self.highlight_cache[(ctx.guild.id, ctx.author.id)].remove(word)
-        except KeyError:
-            pass
         await ctx.send(f"{self.bot.emotes['check']} Updated your highlight list.", hide=True, delete_after=6)
 
         try:
@@ -1325,7 +1653,7 @@ class utility(commands.Cog, description="Get utilities like prefixes, serverinfo
             await confirm.message.edit(content='Timed out.', view=None, delete_after=6)
         else:
             await self.bot.db.execute("DELETE FROM highlight WHERE author_id = $1 AND guild_id = $2", ctx.author.id, ctx.guild.id)
-            self.highlight_cache.pop((ctx.guild.id, ctx.author.id), None)
+            self.clear_highlights(ctx.guild.id, ctx.author.id)
                 
             await confirm.message.edit(content=f"{self.bot.emotes['check']} Cleared all your highlights.", delete_after=6, view=None)   
             
@@ -1374,14 +1702,55 @@ class utility(commands.Cog, description="Get utilities like prefixes, serverinfo
         view = HighlightUnIgnoreView(ctx)
         await view.start()
 
-    async def generate_context(self, msg: discord.Message, hl: str) -> discord.Embed:
+    async def generate_context(
+        self, msg: discord.Message, hl: str, *, context: tuple[MessageSnippet, ...] = ()) -> discord.Embed:
+        """Build the highlight context embed.
+
+        The locally buffered messages are used when there are enough of them,
+        otherwise this falls back to fetching the channel history."""
+
+        if len(context) < self.recent_messages.size:
+            context = tuple(
+                MessageSnippet(m.id, m.author.name, m.created_at, m.content[:100])
+                async for m in msg.channel.history(limit=self.recent_messages.size, before=discord.Object(id=msg.id + 1))
+            )[::-1]
+
         fmt = []
-        async for m in msg.channel.history(limit=5):
+        for m in context:
             time_fmt = discord.utils.format_dt(m.created_at, style='t')
-            fmt.append(f"**[{time_fmt}] {m.author.name}:** {m.content[:100]}")
-        e = discord.Embed(title=f"**{hl}**", description='\n'.join(fmt[::-1]))
+            fmt.append(f"**[{time_fmt}] {m.author}:** {m.content}")
+        e = discord.Embed(title=f"**{hl}**", description='\n'.join(fmt))
         return e
 
+    async def send_highlight(self, user_id: int, channel_id: int, hits: list[HighlightHit]) -> None:
+        """DM a user one summary of the highlight hits queued for a channel."""
+
+        message = hits[-1].message
+        user = message.guild.get_member(user_id)
+        if user is None:
+            return
+
+        words = list(dict.fromkeys(hit.word for hit in hits))
+        embed = await self.generate_context(message, ', '.join(words), context=hits[-1].context)
+
+        view = discord.ui.View()
+        for index, hit in enumerate(hits[-5:], start=1):
+            label = 'Jump to message' if len(hits) == 1 else f'Jump to message {index}'
+            view.add_item(discord.ui.Button(label=label, url=hit.message.jump_url))
+
+        if len(words) == 1:
+            content = f"In {message.channel.mention}, you were mentioned with the highlighted word \"{words[0]}\""
+        else:
+            joined = ', '.join(f'"{word}"' for word in words)
+            content = f"In {message.channel.mention}, you were mentioned with the highlighted words {joined}"
+        if len(hits) > 1:
+            content += f" ({len(hits)} messages)"
+
+        try:
+            await user.send(content, embed=embed, view=view)
+        except discord.HTTPException:
+            pass
+
     @commands.Cog.listener("on_message")
     async def highlight_core(self, message: discord.Message):
         """The core of highlight."""
@@ -1389,50 +1758,40 @@ class utility(commands.Cog, description="Get utilities like prefixes, serverinfo
         
         if message.guild is None:
             return
+
+        self.recent_messages.add(message)
         if message.author.bot:
             return
 
+        matcher = self.highlight_matchers.get(message.guild.id)
+        if not matcher:
+            return
+
         final_message = self.website_regex.sub('', message.content.lower())
         final_message = self.regex_pattern.sub('', final_message)
-        
-        if self.highlight_cache:
-            try:
-                for key, value in self.highlight_cache.items(): 
-                    #local_last_seen = self.last_seen.get(int(value[1]))
-                    #if not local_last_seen or ((discord.utils.utcnow() - local_last_seen).total_seconds() < 300):
-                        #continue
-                    if message.guild.id != key[0]:
-                        continue
-                    for word in value:
-                        if str(word).lower() in final_message and message.author.id != key[1]:
-
-                            check = await self.bot.db.fetchval('SELECT 1 FROM highlight_ignored WHERE user_id = $1 AND guild_id = $2 AND entity_id = $3',
-                            key[1], message.guild.id, message.author.id)
-                            if check:
-                                continue # ignore list
-
-                            embed = await self.generate_context(message, word)
-
-                            view = discord.ui.View()
-                            view.add_item(discord.ui.Button(label='Jump to message', url=message.jump_url))
-                            
-                            user = message.guild.get_member(key[1])
-                            if user is not None and user in message.mentions:
-                                continue
-
-                            if user is not None and message.channel.permissions_for(user).read_messages:
-                                ctx = await self.bot.get_context(message)
-                                if ctx.prefix is not None:
-                                    continue
-
-                                await user.send(
-                                    f"In {message.channel.mention}, you were mentioned with the highlighted word \"{word}\"", 
-                                    embed=embed, view=view)
-                                break
-                        continue
-
-            except RuntimeError:
-                pass # Can't do shit really 
+
+        context = None
+        for user_id, word in matcher.match(final_message).items():
+            if message.author.id == user_id:
+                continue
+
+            ignored = self.highlight_ignored.get((message.guild.id, user_id))
+            if ignored and (message.author.id in ignored or message.channel.id in ignored):
+                continue # ignore list
+
+            user = message.guild.get_member(user_id)
+            if user is None or user in message.mentions:
+                continue
+
+            if not message.channel.permissions_for(user).read_messages:
+                continue
+
+            if await self.bot.is_command_invocation(message):
+                return
+
+            if context is None:
+                context = self.recent_messages.snapshot(message.channel.id)
+            self.highlight_queue.put(user_id, message.channel.id, HighlightHit(message, word, context))
 
 async def setup(bot: MetroBot):
     await bot.add_cog(utility(bot))
\ No newline at end of file
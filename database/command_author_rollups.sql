@@ -0,0 +1,8 @@
+CREATE TABLE IF NOT EXISTS command_author_rollups
+(
+    guild_id bigint NOT NULL,
+    day date NOT NULL,
+    author_id bigint NOT NULL,
+    uses bigint NOT NULL,
+    CONSTRAINT command_author_rollups_pkey PRIMARY KEY (guild_id, day, author_id)
+)
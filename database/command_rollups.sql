@@ -0,0 +1,9 @@
+CREATE TABLE IF NOT EXISTS command_rollups
+(
+    guild_id bigint NOT NULL,
+    day date NOT NULL,
+    command text COLLATE pg_catalog."default" NOT NULL,
+    uses bigint NOT NULL,
+    first_used timestamp without time zone NOT NULL,
+    CONSTRAINT command_rollups_pkey PRIMARY KEY (guild_id, day, command)
+)
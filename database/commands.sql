@@ -0,0 +1,17 @@
+CREATE TABLE IF NOT EXISTS commands
+(
+    id bigserial NOT NULL,
+    guild_id bigint,
+    channel_id bigint,
+    author_id bigint,
+    used timestamp without time zone,
+    prefix text COLLATE pg_catalog."default",
+    command text COLLATE pg_catalog."default",
+    failed boolean,
+    app_command boolean
+) PARTITION BY RANGE (used);
+
+CREATE TABLE IF NOT EXISTS commands_default PARTITION OF commands DEFAULT;
+
+CREATE INDEX IF NOT EXISTS commands_guild_id_used_idx ON commands (guild_id, used);
+CREATE INDEX IF NOT EXISTS commands_guild_id_author_id_idx ON commands (guild_id, author_id);
@@ -0,0 +1,7 @@
+-- requires: reminders
+-- reminder ids used to be allocated with SELECT MAX(id) + 1
+CREATE SEQUENCE IF NOT EXISTS reminders_id_seq OWNED BY reminders.id;
+
+SELECT setval('reminders_id_seq', COALESCE((SELECT MAX(id) FROM reminders), 0) + 1, false);
+
+ALTER TABLE reminders ALTER COLUMN id SET DEFAULT nextval('reminders_id_seq');
@@ -0,0 +1,6 @@
+-- requires: reminders
+-- timers are leased to the process firing them instead of being deleted up front
+ALTER TABLE reminders ADD COLUMN IF NOT EXISTS claimed_by text;
+ALTER TABLE reminders ADD COLUMN IF NOT EXISTS lease_expires timestamp without time zone;
+
+CREATE INDEX IF NOT EXISTS reminders_expires_idx ON reminders (expires);
@@ -0,0 +1,15 @@
+-- requires: reminders
+-- lookup keys used to only live in extra->'kwargs', which can't be indexed
+ALTER TABLE reminders ADD COLUMN IF NOT EXISTS guild_id bigint;
+ALTER TABLE reminders ADD COLUMN IF NOT EXISTS channel_id bigint;
+ALTER TABLE reminders ADD COLUMN IF NOT EXISTS message_id bigint;
+
+UPDATE reminders SET
+    guild_id = (extra->'kwargs'->>'guild_id')::bigint,
+    channel_id = (extra->'kwargs'->>'channel_id')::bigint,
+    message_id = (extra->'kwargs'->>'message_id')::bigint
+WHERE extra->'kwargs' ?| ARRAY['guild_id', 'channel_id', 'message_id'];
+
+CREATE INDEX IF NOT EXISTS reminders_event_guild_id_idx ON reminders (event, guild_id) WHERE guild_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS reminders_event_channel_id_idx ON reminders (event, channel_id) WHERE channel_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS reminders_event_message_id_idx ON reminders (event, message_id) WHERE message_id IS NOT NULL;
@@ -0,0 +1,32 @@
+-- requires: commands
+-- daily per guild counts for the stats commands, guild_id 0 holds private messages
+CREATE TABLE IF NOT EXISTS command_rollups
+(
+    guild_id bigint NOT NULL,
+    day date NOT NULL,
+    command text NOT NULL,
+    uses bigint NOT NULL,
+    first_used timestamp without time zone NOT NULL,
+    CONSTRAINT command_rollups_pkey PRIMARY KEY (guild_id, day, command)
+);
+
+CREATE TABLE IF NOT EXISTS command_author_rollups
+(
+    guild_id bigint NOT NULL,
+    day date NOT NULL,
+    author_id bigint NOT NULL,
+    uses bigint NOT NULL,
+    CONSTRAINT command_author_rollups_pkey PRIMARY KEY (guild_id, day, author_id)
+);
+
+INSERT INTO command_rollups (guild_id, day, command, uses, first_used)
+SELECT COALESCE(guild_id, 0), used::date, command, COUNT(*), MIN(used)
+FROM commands
+GROUP BY 1, 2, 3
+ON CONFLICT DO NOTHING;
+
+INSERT INTO command_author_rollups (guild_id, day, author_id, uses)
+SELECT COALESCE(guild_id, 0), used::date, author_id, COUNT(*)
+FROM commands
+GROUP BY 1, 2, 3
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,37 @@
+-- requires: commands
+-- commands becomes partitioned by month on used, see stats.commands_partition_loop
+ALTER TABLE commands RENAME TO commands_unpartitioned;
+
+CREATE TABLE commands (LIKE commands_unpartitioned INCLUDING DEFAULTS) PARTITION BY RANGE (used);
+CREATE TABLE commands_default PARTITION OF commands DEFAULT;
+
+DO $$
+DECLARE
+    month date := date_trunc('month', COALESCE((SELECT MIN(used) FROM commands_unpartitioned), now() AT TIME ZONE 'utc'))::date;
+    last date := (date_trunc('month', now() AT TIME ZONE 'utc') + INTERVAL '2 months')::date;
+    seq regclass;
+BEGIN
+    WHILE month <= last LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF commands FOR VALUES FROM (%L) TO (%L)',
+            'commands_' || to_char(month, '"y"YYYY"m"MM'), month, (month + INTERVAL '1 month')::date
+        );
+        month := (month + INTERVAL '1 month')::date;
+    END LOOP;
+
+    -- the new table shares the id sequence, keep it alive when the old table goes
+    FOR seq IN
+        SELECT d.objid::regclass
+        FROM pg_depend d
+        JOIN pg_class c ON c.oid = d.objid
+        WHERE d.refobjid = 'commands_unpartitioned'::regclass AND d.deptype = 'a' AND c.relkind = 'S'
+    LOOP
+        EXECUTE format('ALTER SEQUENCE %s OWNED BY NONE', seq);
+    END LOOP;
+END $$;
+
+INSERT INTO commands SELECT * FROM commands_unpartitioned;
+DROP TABLE commands_unpartitioned;
+
+CREATE INDEX IF NOT EXISTS commands_guild_id_used_idx ON commands (guild_id, used);
+CREATE INDEX IF NOT EXISTS commands_guild_id_author_id_idx ON commands (guild_id, author_id);
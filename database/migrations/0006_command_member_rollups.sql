@@ -0,0 +1,19 @@
+-- requires: commands
+-- daily per member counts so member stats outlive the dropped partitions of commands
+CREATE TABLE IF NOT EXISTS command_member_rollups
+(
+    guild_id bigint NOT NULL,
+    author_id bigint NOT NULL,
+    day date NOT NULL,
+    command text NOT NULL,
+    uses bigint NOT NULL,
+    first_used timestamp without time zone NOT NULL,
+    CONSTRAINT command_member_rollups_pkey PRIMARY KEY (guild_id, author_id, day, command)
+);
+
+INSERT INTO command_member_rollups (guild_id, author_id, day, command, uses, first_used)
+SELECT COALESCE(guild_id, 0), author_id, used::date, command, COUNT(*), MIN(used)
+FROM commands
+WHERE author_id IS NOT NULL AND command IS NOT NULL AND used IS NOT NULL
+GROUP BY 1, 2, 3, 4
+ON CONFLICT DO NOTHING;
@@ -0,0 +1,36 @@
+-- a version per table bumped in the same transaction as every write to it,
+-- the restart cache snapshot is only trusted for tables whose version didn't move
+CREATE TABLE IF NOT EXISTS table_versions
+(
+    table_name text PRIMARY KEY,
+    version bigint NOT NULL DEFAULT 0
+);
+
+CREATE OR REPLACE FUNCTION bump_table_version() RETURNS trigger AS $$
+BEGIN
+    INSERT INTO table_versions (table_name, version) VALUES (TG_TABLE_NAME, 1)
+    ON CONFLICT (table_name) DO UPDATE SET version = table_versions.version + 1;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DO $$
+DECLARE
+    name text;
+BEGIN
+    FOREACH name IN ARRAY ARRAY[
+        'prefixes', 'premium_guilds', 'votes', 'guild_blacklist', 'blacklist', 'highlight',
+        'highlight_ignored', 'afk', 'plonks', 'command_config', 'reactionroles'
+    ] LOOP
+        -- tables created later from database/ have no trigger, so their caches are never restored
+        CONTINUE WHEN to_regclass(name) IS NULL;
+
+        EXECUTE format('DROP TRIGGER IF EXISTS %I ON %I', name || '_version', name);
+        EXECUTE format(
+            'CREATE TRIGGER %I AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON %I '
+            'FOR EACH STATEMENT EXECUTE PROCEDURE bump_table_version()',
+            name || '_version', name
+        );
+        INSERT INTO table_versions (table_name) VALUES (name) ON CONFLICT DO NOTHING;
+    END LOOP;
+END $$;
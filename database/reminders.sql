@@ -1,9 +1,14 @@
 CREATE TABLE IF NOT EXISTS reminders
 (
-    id bigint NOT NULL,
+    id bigserial NOT NULL,
     event text COLLATE pg_catalog."default" NOT NULL,
     extra jsonb NOT NULL,
     expires timestamp without time zone NOT NULL,
     created timestamp without time zone NOT NULL,
+    claimed_by text,
+    lease_expires timestamp without time zone,
+    guild_id bigint,
+    channel_id bigint,
+    message_id bigint,
     CONSTRAINT reminders_pkey PRIMARY KEY (id)
 )
@@ -0,0 +1,170 @@
+"""Lease based timer claiming against a real Postgres.
+
+Set ``METRO_TEST_DSN`` to a database the tests may create a throwaway
+schema in, for example::
+
+    METRO_TEST_DSN=postgresql://postgres@localhost/metro_test python -m pytest tests
+"""
+
+import asyncio
+import datetime
+import os
+import uuid
+from pathlib import Path
+
+import pytest
+
+asyncpg = pytest.importorskip('asyncpg')
+pytest.importorskip('discord')
+
+from utils.timers import claim_timers, delete_claimed_timer, release_timer, renew_leases
+
+DSN = os.environ.get('METRO_TEST_DSN')
+SCHEMA_FILE = Path(__file__).parents[1] / 'database' / 'reminders.sql'
+
+LEASE = datetime.timedelta(seconds=90)
+
+pytestmark = pytest.mark.skipif(not DSN, reason='METRO_TEST_DSN is not set')
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+async def connect(schema: str) -> 'asyncpg.Connection':
+    return await asyncpg.connect(DSN, server_settings={'search_path': schema})
+
+
+class Database:
+    """A fresh ``reminders`` table in its own schema with two owners connected to it."""
+
+    def __init__(self) -> None:
+        self.schema = f'metro_test_{uuid.uuid4().hex[:12]}'
+
+    async def __aenter__(self) -> 'Database':
+        admin = await asyncpg.connect(DSN)
+        try:
+            await admin.execute(f'CREATE SCHEMA {self.schema};')
+        finally:
+            await admin.close()
+
+        self.setup = await connect(self.schema)
+        await self.setup.execute(SCHEMA_FILE.read_text(encoding='utf-8'))
+        self.first = await connect(self.schema)
+        self.second = await connect(self.schema)
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        for connection in (self.first, self.second):
+            await connection.close()
+        await self.setup.execute(f'DROP SCHEMA {self.schema} CASCADE;')
+        await self.setup.close()
+
+    async def add_timers(self, count: int, expires: datetime.datetime) -> list[int]:
+        query = """INSERT INTO reminders (event, extra, expires, created)
+                   SELECT 'reminder', '{"args": [], "kwargs": {}}'::jsonb, $1, $1
+                   FROM generate_series(1, $2)
+                   RETURNING id;
+                """
+        return [record['id'] for record in await self.setup.fetch(query, expires, count)]
+
+    async def owner_of(self, timer_id: int):
+        return await self.setup.fetchval('SELECT claimed_by FROM reminders WHERE id = $1;', timer_id)
+
+
+def test_timers_are_never_claimed_twice():
+    async def main():
+        async with Database() as db:
+            now = datetime.datetime.utcnow()
+            ids = await db.add_timers(200, now)
+
+            async def claim_all(connection, owner):
+                claimed = []
+                while True:
+                    records = await claim_timers(connection, owner, until=now, now=now, lease=LEASE, limit=7)
+                    if not records:
+                        return claimed
+                    claimed.extend(record['id'] for record in records)
+                    await asyncio.sleep(0)
+
+            first, second = await asyncio.gather(claim_all(db.first, 'first'), claim_all(db.second, 'second'))
+
+            assert not set(first) & set(second)
+            assert len(first) + len(second) == len(set(first) | set(second)) == len(ids)
+            assert sorted(first + second) == sorted(ids)
+
+    run(main())
+
+
+def test_lapsed_lease_is_taken_over():
+    async def main():
+        async with Database() as db:
+            now = datetime.datetime.utcnow()
+            timer_id, = await db.add_timers(1, now)
+
+            claimed = await claim_timers(db.first, 'first', until=now, now=now, lease=LEASE, limit=10)
+            assert [record['id'] for record in claimed] == [timer_id]
+
+            # still leased, nobody else gets it
+            later = now + LEASE / 2
+            assert await claim_timers(db.second, 'second', until=later, now=later, lease=LEASE, limit=10) == []
+
+            # renewing keeps it past the original lease
+            await renew_leases(db.first, 'first', [timer_id], expires=later + LEASE)
+            after_first_lease = now + LEASE + datetime.timedelta(seconds=1)
+            assert await claim_timers(
+                db.second, 'second', until=after_first_lease, now=after_first_lease, lease=LEASE, limit=10
+            ) == []
+
+            # once the renewed lease lapses the other owner takes over
+            lapsed = later + LEASE + datetime.timedelta(seconds=1)
+            claimed = await claim_timers(db.second, 'second', until=lapsed, now=lapsed, lease=LEASE, limit=10)
+            assert [record['id'] for record in claimed] == [timer_id]
+            assert await db.owner_of(timer_id) == 'second'
+
+            # the old owner can't renew a lease it lost
+            await renew_leases(db.first, 'first', [timer_id], expires=lapsed + LEASE * 10)
+            expires = await db.setup.fetchval('SELECT lease_expires FROM reminders WHERE id = $1;', timer_id)
+            assert expires == lapsed + LEASE
+
+    run(main())
+
+
+def test_only_the_owner_deletes_a_timer():
+    async def main():
+        async with Database() as db:
+            now = datetime.datetime.utcnow()
+            timer_id, = await db.add_timers(1, now)
+
+            await claim_timers(db.first, 'first', until=now, now=now, lease=LEASE, limit=10)
+            lapsed = now + LEASE + datetime.timedelta(seconds=1)
+            await claim_timers(db.second, 'second', until=lapsed, now=lapsed, lease=LEASE, limit=10)
+
+            assert await delete_claimed_timer(db.first, timer_id, 'first') is False
+            assert await db.owner_of(timer_id) == 'second'
+
+            assert await delete_claimed_timer(db.second, timer_id, 'second') is True
+            assert await db.setup.fetchval('SELECT COUNT(*) FROM reminders WHERE id = $1;', timer_id) == 0
+
+    run(main())
+
+
+def test_released_timer_is_retried_later():
+    async def main():
+        async with Database() as db:
+            now = datetime.datetime.utcnow()
+            timer_id, = await db.add_timers(1, now)
+
+            await claim_timers(db.first, 'first', until=now, now=now, lease=LEASE, limit=10)
+            retry_at = now + datetime.timedelta(minutes=5)
+            assert await release_timer(db.second, timer_id, 'second', retry_at=retry_at) is False
+            assert await release_timer(db.first, timer_id, 'first', retry_at=retry_at) is True
+            assert await db.owner_of(timer_id) is None
+
+            # held back until the retry time, then anyone may claim it again
+            assert await claim_timers(db.second, 'second', until=now, now=now, lease=LEASE, limit=10) == []
+            later = retry_at + datetime.timedelta(seconds=1)
+            claimed = await claim_timers(db.second, 'second', until=later, now=later, lease=LEASE, limit=10)
+            assert [record['id'] for record in claimed] == [timer_id]
+
+    run(main())
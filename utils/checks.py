@@ -1,8 +1,6 @@
-import datetime
 from typing import Union
 import discord
 from discord.ext import commands
-import pytz
 from .constants import SUPPORT_GUILD
 
 from utils.custom_context import MyContext
@@ -90,15 +88,10 @@ def is_support():
     return commands.check(predicate)
 
 def has_voted():
-    async def predicate(ctx: MyContext):
+    def predicate(ctx: MyContext):
         """Check if a user_id has voted or not."""
 
-        query = "SELECT next_vote FROM votes WHERE user_id = $1"
-        returned = await ctx.bot.db.fetchval(query, ctx.author.id)
-        if not returned:
-            raise NotVoted()
-        next_vote = pytz.utc.localize(returned) + datetime.timedelta(hours=12)
-        if discord.utils.utcnow() > next_vote:
+        if not ctx.bot.premium.is_premium_user(ctx.author.id):
             raise NotVoted()
         return True
     return commands.check(predicate)
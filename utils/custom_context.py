@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import time
+
 import discord
 from discord.ext import commands
 from discord.ext.commands.core import Command, Group
@@ -58,6 +60,14 @@ class ConfirmationView(discord.ui.View):
 
 class MyContext(commands.Context["MetroBot"]):
     bot: MetroBot
+
+    def __init__(self, **attrs: Any) -> None:
+        super().__init__(**attrs)
+        # wall time spent in each phase of the invocation, see MetroBot.invoke
+        self.timings: dict[str, float] = {}
+        self.invoke_started: Optional[float] = None
+        self.callback_started: Optional[float] = None
+        self.callback_ended: Optional[float] = None
     
     async def check(self):
         emoji = self.bot.get_emoji(819254444197019669)
@@ -91,7 +101,9 @@ class MyContext(commands.Context["MetroBot"]):
 
         #if reply:
             #reference = self.message
+        start = time.perf_counter()
         message = await super().send(content=content, reference=reference, embed=embed, ephemeral=hide, **kwargs)
+        self.timings['response'] = self.timings.get('response', 0.0) + time.perf_counter() - start
 
 
         return message
@@ -15,6 +15,7 @@ file, You can obtain one at http://mozilla.org/MPL/2.0/.
 from collections import OrderedDict
 from pathlib import Path
 import json
+import re
 import os
 import pydoc
 import uuid
@@ -999,4 +1000,77 @@ def create_tables(*tables, verbose=True, loop=None):
     if loop is None:
         loop = asyncio.get_event_loop()
 
-    loop.create_task(_table_creator(tables, verbose=verbose))
\ No newline at end of file
+    loop.create_task(_table_creator(tables, verbose=verbose))
+
+
+_REQUIRES_REGEX = re.compile(r'^--\s*requires:\s*(.+)$', re.MULTILINE)
+
+
+async def run_sql_migrations(pool, *, directory=None, verbose=False):
+    """Applies the plain SQL migrations that have not been run yet.
+
+    These are for the tables kept as SQL files in ``database/`` rather than
+    as :class:`Table` subclasses, which migrate through :meth:`Table.migrate`.
+
+    Every ``.sql`` file in the directory is run once, in file name order,
+    inside its own transaction. Applied files are recorded in the
+    ``schema_migrations`` table.
+
+    A migration lists the tables it changes in a ``-- requires: a, b``
+    comment. When one of them doesn't exist the migration is recorded
+    without running, since a table created later comes from the up to
+    date schema in ``database/``.
+
+    Parameters
+    -----------
+    pool: asyncpg.Pool
+        The pool to run the migrations on.
+    directory: Optional[str]
+        The migrations directory. Defaults to ``database/migrations``.
+    verbose: bool
+        Whether to log every applied migration.
+
+    Returns
+    --------
+    List[str]
+        The names of the migrations that were applied.
+    """
+
+    directory = Path(directory) if directory else Path(__file__).parents[1] / 'database' / 'migrations'
+    if not directory.exists():
+        return []
+
+    applied = []
+    async with pool.acquire() as con:
+        await con.execute(
+            'CREATE TABLE IF NOT EXISTS schema_migrations '
+            '(name TEXT PRIMARY KEY, applied TIMESTAMP NOT NULL DEFAULT (now() at time zone \'utc\'));'
+        )
+        done = {record['name'] for record in await con.fetch('SELECT name FROM schema_migrations;')}
+
+        for path in sorted(directory.glob('*.sql')):
+            if path.name in done:
+                continue
+
+            sql = path.read_text(encoding='utf-8')
+            required = [
+                table.strip()
+                for match in _REQUIRES_REGEX.findall(sql)
+                for table in match.split(',') if table.strip()
+            ]
+            missing = [table for table in required if await con.fetchval('SELECT to_regclass($1);', table) is None]
+
+            async with con.transaction():
+                if not missing:
+                    await con.execute(sql)
+                await con.execute('INSERT INTO schema_migrations (name) VALUES ($1);', path.name)
+
+            if missing:
+                log.info('Skipped migration %s, %s does not exist.', path.name, ', '.join(missing))
+                continue
+
+            applied.append(path.name)
+            if verbose:
+                log.info('Applied migration %s.', path.name)
+
+    return applied
@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable
+import ast
+import asyncio
+import importlib
+import logging
+import sys
+import time
+
+if TYPE_CHECKING:
+    from discord.ext import commands
+
+log = logging.getLogger(__name__)
+
+# modules known to do nothing at import time that needs the event loop's thread,
+# a module or any of its submodules may be imported ahead of time in a worker thread
+PRELOAD_ALLOWLIST = (
+    'discord',
+    'aiohttp',
+    'asyncpg',
+    'yarl',
+    'humanize',
+    'pytz',
+    'thefuzz',
+    'unidecode',
+    'stringcase',
+    'lxml',
+    'psutil',
+    'utils.calc_tils',
+    'utils.checks',
+    'utils.constants',
+    'utils.converters',
+    'utils.custom_context',
+    'utils.embeds',
+    'utils.errors',
+    'utils.formats',
+    'utils.fuzzy',
+    'utils.highlight',
+    'utils.json_loader',
+    'utils.loop_monitor',
+    'utils.metrics',
+    'utils.pages',
+    'utils.remind_utils',
+    'utils.timers',
+    'utils.useful',
+)
+
+
+def preload_allowed(module: str) -> bool:
+    return any(module == name or module.startswith(name + '.') for name in PRELOAD_ALLOWLIST)
+
+
+def find_extensions(root: Path, folders: Iterable[str]) -> list[str]:
+    """The extensions in ``root``/cogs, single files plus the package ``folders``."""
+
+    names = []
+    for path in sorted((root / 'cogs').iterdir()):
+        if path.suffix == '.py' and not path.name.startswith('_'):
+            names.append(f'cogs.{path.stem}')
+        if path.name in folders:
+            names.append(f'cogs.{path.name}')
+    return names
+
+
+def _source_files(root: Path, name: str) -> list[Path]:
+    path = root.joinpath(*name.split('.'))
+    if path.is_dir():
+        return sorted(path.rglob('*.py'))
+    return [path.with_suffix('.py')]
+
+
+def _imports(root: Path, name: str) -> tuple[set[str], set[str]]:
+    """Every module an extension's source imports, and those imported when it loads.
+
+    Imports nested in functions or ``if TYPE_CHECKING`` still mean the extension
+    uses the other one, but only module level imports run at load time."""
+
+    everything: set[str] = set()
+    at_load: set[str] = set()
+    for file in _source_files(root, name):
+        tree = ast.parse(file.read_text(encoding='utf-8'), str(file))
+        top_level = set(map(id, tree.body))
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+                modules = [node.module]
+            else:
+                # relative imports stay inside the extension's own package
+                continue
+
+            everything.update(modules)
+            if id(node) in top_level:
+                at_load.update(modules)
+    return everything, at_load
+
+
+def extension_levels(root: Path, names: list[str]) -> tuple[list[list[str]], set[str]]:
+    """Sort extensions into levels that only import extensions from earlier levels.
+
+    Also returns the modules that are imported when the extensions load and
+    are in :data:`PRELOAD_ALLOWLIST`."""
+
+    depends: dict[str, set[str]] = {}
+    preload: set[str] = set()
+    for name in names:
+        everything, at_load = _imports(root, name)
+        depends[name] = {
+            other for other in names
+            if other != name and any(module == other or module.startswith(other + '.') for module in everything)
+        }
+        preload.update(module for module in at_load if preload_allowed(module))
+
+    levels: list[list[str]] = []
+    loaded: set[str] = set()
+    remaining = list(names)
+    while remaining:
+        level = [name for name in remaining if depends[name] <= loaded]
+        if not level:
+            log.warning('Extensions import each other, loading them together: %s', ', '.join(remaining))
+            level = remaining
+        levels.append(level)
+        loaded.update(level)
+        remaining = [name for name in remaining if name not in loaded]
+    return levels, preload
+
+
+def _import(module: str) -> None:
+    try:
+        importlib.import_module(module)
+    except Exception as e:
+        # the extension imports it again and fails properly there
+        log.warning('Could not import %s ahead of the extensions: %s', module, e)
+
+
+async def preload_modules(modules: Iterable[str]) -> None:
+    """Import modules in worker threads so the event loop doesn't have to."""
+
+    missing = [module for module in modules if module not in sys.modules]
+    await asyncio.gather(*(asyncio.to_thread(_import, module) for module in missing))
+
+
+async def _load_extension(bot: commands.Bot, name: str) -> None:
+    start = time.perf_counter()
+    await bot.load_extension(name)
+    log.info('Loaded extension %s in %.2fms', name, (time.perf_counter() - start) * 1000)
+
+
+async def load_extensions(bot: commands.Bot, root: Path, names: list[str]) -> None:
+    """Load extensions level by level of the import graph.
+
+    The extensions of a level are gathered, but :meth:`commands.Bot.load_extension`
+    executes the extension's module synchronously on the event loop, so only
+    the awaits in ``setup`` and ``cog_load`` actually overlap. Most of the
+    time saved comes from the allowlisted modules imported in worker threads
+    beforehand."""
+
+    start = time.perf_counter()
+    levels, preload = extension_levels(root, names)
+    await preload_modules(preload)
+    log.info('Imported %s modules ahead of the extensions in %.2fms', len(preload), (time.perf_counter() - start) * 1000)
+
+    for level in levels:
+        await asyncio.gather(*(_load_extension(bot, name) for name in level))
+
+    log.info('Loaded %s extensions in %s levels in %.2fms', len(names), len(levels), (time.perf_counter() - start) * 1000)
@@ -0,0 +1,261 @@
+from collections import OrderedDict, deque
+from typing import Any, Awaitable, Callable, NamedTuple
+import asyncio
+import datetime
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class HighlightMatcher:
+    """An Aho-Corasick automaton over a single guild's highlight words.
+
+    Every word keeps the set of user IDs that highlighted it. The automaton
+    is only recompiled when a word is added to or dropped from the guild,
+    and that happens lazily on the next lookup.
+    """
+
+    __slots__ = ('words', '_goto', '_fail', '_out', '_dirty')
+
+    def __init__(self) -> None:
+        self.words: dict[str, set[int]] = {}
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[tuple[str, ...]] = [()]
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self.words)
+
+    def __repr__(self) -> str:
+        return f'<HighlightMatcher words={len(self.words)}>'
+
+    def add(self, word: str, user_id: int) -> None:
+        """Register ``word`` as highlighted by ``user_id``.
+
+        Words are matched case insensitively against lowercased content."""
+
+        word = word.lower()
+        users = self.words.get(word)
+        if users is None:
+            self.words[word] = {user_id}
+            self._dirty = True
+        else:
+            users.add(user_id)
+
+    def remove(self, word: str, user_id: int) -> None:
+        """Unregister ``word`` for ``user_id``. Unknown words are ignored."""
+
+        word = word.lower()
+        users = self.words.get(word)
+        if users is None:
+            return
+
+        users.discard(user_id)
+        if not users:
+            del self.words[word]
+            self._dirty = True
+
+    def _build(self) -> None:
+        goto: list[dict[str, int]] = [{}]
+        out: list[list[str]] = [[]]
+
+        for word in self.words:
+            state = 0
+            for char in word:
+                nxt = goto[state].get(char)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][char] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append(word)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in goto[state].items():
+                queue.append(nxt)
+
+                link = fail[state]
+                while link and char not in goto[link]:
+                    link = fail[link]
+                link = goto[link].get(char, 0)
+
+                fail[nxt] = link
+                out[nxt].extend(out[link])
+
+        self._goto = goto
+        self._fail = fail
+        self._out = [tuple(words) for words in out]
+        self._dirty = False
+
+    def find(self, text: str) -> list[str]:
+        """Return every highlighted word found in ``text`` in one pass.
+
+        Words are returned once each, ordered by where they first end in the text.
+        """
+
+        if self._dirty:
+            self._build()
+
+        goto, fail, out = self._goto, self._fail, self._out
+        found: dict[str, None] = {}
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for word in out[state]:
+                found[word] = None
+        return list(found)
+
+    def match(self, text: str) -> dict[int, str]:
+        """Map each user with a highlight in ``text`` to the first word that hit."""
+
+        matches: dict[int, str] = {}
+        for word in self.find(text):
+            for user_id in self.words[word]:
+                matches.setdefault(user_id, word)
+        return matches
+
+
+class MessageSnippet(NamedTuple):
+    id: int
+    author: str
+    created_at: datetime.datetime
+    content: str
+
+
+class RecentMessages:
+    """A ring buffer of the last few messages seen in each channel.
+
+    Only the bits needed to render highlight context are kept. The number of
+    tracked channels is capped and the least recently active one is evicted.
+    """
+
+    def __init__(self, *, size: int = 5, max_channels: int = 5000) -> None:
+        self.size = size
+        self.max_channels = max_channels
+        self._channels: OrderedDict[int, deque[MessageSnippet]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._channels)
+
+    def add(self, message: Any) -> None:
+        channel_id = message.channel.id
+        snippets = self._channels.get(channel_id)
+        if snippets is None:
+            snippets = self._channels[channel_id] = deque(maxlen=self.size)
+            if len(self._channels) > self.max_channels:
+                self._channels.popitem(last=False)
+        else:
+            self._channels.move_to_end(channel_id)
+
+        snippets.append(MessageSnippet(message.id, message.author.name, message.created_at, message.content[:100]))
+
+    def snapshot(self, channel_id: int) -> tuple[MessageSnippet, ...]:
+        """Return the buffered messages for a channel, oldest first."""
+
+        snippets = self._channels.get(channel_id)
+        return tuple(snippets) if snippets else ()
+
+
+class HighlightHit(NamedTuple):
+    message: Any
+    word: str
+    context: tuple[MessageSnippet, ...] = ()
+
+
+class HighlightQueue:
+    """Coalesces highlight hits and delivers them from a small worker pool.
+
+    Hits for the same (user, channel) pair that arrive within ``window``
+    seconds are handed to ``deliver`` together. A user gets at most one
+    delivery every ``cooldown`` seconds; hits that land during the cooldown
+    are held back and merged into the next delivery instead of being sent.
+    """
+
+    def __init__(
+        self,
+        deliver: Callable[[int, int, list[HighlightHit]], Awaitable[None]],
+        *,
+        window: float = 5.0,
+        cooldown: float = 30.0,
+        workers: int = 4,
+        max_hits: int = 10
+    ) -> None:
+        self.deliver = deliver
+        self.window = window
+        self.cooldown = cooldown
+        self.max_hits = max_hits
+        self.worker_count = workers
+
+        self.dropped = 0
+
+        self._pending: dict[tuple[int, int], list[HighlightHit]] = {}
+        self._next_allowed: dict[int, float] = {}
+        self._ready: asyncio.Queue[tuple[int, int]] = asyncio.Queue()
+        self._workers: list[asyncio.Task] = []
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def start(self) -> None:
+        if self._workers:
+            return
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.worker_count)]
+
+    def close(self) -> None:
+        for worker in self._workers:
+            worker.cancel()
+        self._workers.clear()
+        self._pending.clear()
+
+    def put(self, user_id: int, channel_id: int, hit: HighlightHit) -> None:
+        """Queue a hit for ``user_id``. This never blocks."""
+
+        key = (user_id, channel_id)
+        hits = self._pending.get(key)
+        if hits is None:
+            self._pending[key] = [hit]
+            self._schedule(key, self.window)
+        elif len(hits) < self.max_hits:
+            hits.append(hit)
+        else:
+            self.dropped += 1
+
+    def _schedule(self, key: tuple[int, int], delay: float) -> None:
+        asyncio.get_running_loop().call_later(delay, self._ready.put_nowait, key)
+
+    def _prune(self, now: float) -> None:
+        self._next_allowed = {k: v for k, v in self._next_allowed.items() if v > now}
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            key = await self._ready.get()
+            user_id = key[0]
+
+            now = loop.time()
+            allowed = self._next_allowed.get(user_id, 0.0)
+            if now < allowed:
+                self._schedule(key, allowed - now)
+                continue
+
+            hits = self._pending.pop(key, None)
+            if not hits:
+                continue
+
+            if len(self._next_allowed) > 10000:
+                self._prune(now)
+            self._next_allowed[user_id] = now + self.cooldown
+
+            try:
+                await self.deliver(user_id, key[1], hits)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                log.exception('Failed delivering %s highlight(s) to user %s', len(hits), user_id)
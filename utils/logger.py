@@ -1,8 +1,14 @@
 import logging
+import logging.handlers
 import asyncio
+import atexit
+import datetime
+import json
 import os
+import queue
 import sys
-from typing import Any 
+from collections import deque
+from typing import Any, Optional
 import aiohttp
 from discord.utils import MISSING, _ColourFormatter
 
@@ -14,40 +20,177 @@ if not logger_webhook:
     wb = False
 else:
     wb = True
+# optional path of a JSON lines copy of the log
+json_log_file = info_file.get('json_log_file')
+
+# attributes every LogRecord has, anything else was passed with extra=
+_RECORD_ATTRS = frozenset(logging.makeLogRecord({}).__dict__) | {'message', 'asctime', 'taskName'}
 
 class Discord_Handler(logging.Handler):
+    """Ships log records to a webhook from a single background task.
+
+    ``emit`` only formats the record and puts it on a bounded queue, from any
+    thread. The sender packs as many queued records as fit into one message,
+    posts it with a long lived session and waits out webhook rate limits.
+    Records that don't fit in the queue or can't be delivered are counted
+    in ``dropped``.
+    """
+
+    # room left for the codeblock around the content
+    MAX_CONTENT = 2000 - len('```\n```')
 
-    def __init__(self, url):
+    def __init__(self, url, *, max_queue: int = 1000):
         logging.Handler.__init__(self)
         self.url = url
+        self.max_queue = max_queue
+        self.dropped = 0
 
-    def mapLogRecord(self, record):
-        return record.__dict__
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue[str]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._carry: Optional[str] = None
+        # records emitted before there is an event loop to send them from
+        self._early: deque[str] = deque(maxlen=max_queue)
 
     def emit(self, record):
-        asyncio.create_task(self.emitting(record))
-
-    async def emitting(self, record):
         try:
             msg = self.format(record)
-            url = self.url
-            headers = {}
-            data = self.mapLogRecord(record)
-            headers["Content-type"] = "application/x-www-form-urlencoded"
-            #can't do anything with the result
-            if len(msg) > 1900:
-                msg_list = [msg[i: i+1900] for i in range(0, len(msg), 1900)]
-                for i in msg_list:
-              	    async with aiohttp.request("POST", url, data={'content':f"```{i}```"}, headers=headers):
-                        pass
-            else:
-                if 'aiohttp.http_exceptions.BadStatusLine' in msg or 'UNKNOWN / HTTP/1.0' in msg:
-                    pass
-
-                async with aiohttp.request("POST", url, data={'content':f"```{msg}```"}, headers=headers):
-                    pass
         except Exception:
             self.handleError(record)
+            return
+
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        if loop is not None and (self._loop is None or self._loop.is_closed()):
+            self._start(loop)
+
+        if self._loop is None or self._loop.is_closed():
+            self._early.append(msg)
+        elif loop is self._loop:
+            self._put(msg)
+        else:
+            self._loop.call_soon_threadsafe(self._put, msg)
+
+    def close(self):
+        if self._task is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._task.cancel)
+        logging.Handler.close(self)
+
+    def _start(self, loop: asyncio.AbstractEventLoop) -> None:
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._carry = None
+        self._task = loop.create_task(self._sender())
+        while self._early:
+            self._put(self._early.popleft())
+
+    def _put(self, msg: str) -> None:
+        limit = self.MAX_CONTENT
+        for chunk in [msg[i: i+limit] for i in range(0, len(msg), limit)]:
+            if self._queue.qsize() >= self.max_queue:
+                self.dropped += 1
+            else:
+                self._queue.put_nowait(chunk)
+
+    async def _next_batch(self) -> str:
+        if self._carry is not None:
+            first, self._carry = self._carry, None
+        else:
+            first = await self._queue.get()
+
+        parts = [first]
+        size = len(first)
+        while not self._queue.empty():
+            msg = self._queue.get_nowait()
+            if size + 1 + len(msg) > self.MAX_CONTENT:
+                self._carry = msg
+                break
+            parts.append(msg)
+            size += 1 + len(msg)
+        return '\n'.join(parts)
+
+    async def _post(self, session: aiohttp.ClientSession, content: str) -> None:
+        payload = {'content': f'```\n{content}```'}
+        for attempt in range(5):
+            try:
+                async with session.post(self.url, json=payload) as resp:
+                    if resp.status == 429:
+                        await asyncio.sleep(float(resp.headers.get('Retry-After', 1)))
+                        continue
+                    if resp.status >= 500:
+                        await asyncio.sleep(2 ** attempt)
+                        continue
+
+                    # the bucket is empty, wait for it before the next post
+                    if resp.headers.get('X-RateLimit-Remaining') == '0':
+                        await asyncio.sleep(float(resp.headers.get('X-RateLimit-Reset-After', 1)))
+                    return
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                await asyncio.sleep(2 ** attempt)
+        self.dropped += 1
+
+    async def _sender(self) -> None:
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=15)) as session:
+            while True:
+                content = await self._next_batch()
+                try:
+                    await self._post(session, content)
+                except asyncio.CancelledError:
+                    raise
+                except Exception:
+                    self.dropped += 1
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """A :class:`~logging.handlers.QueueHandler` that doesn't format on the way in.
+
+    The stock handler formats every record in the calling thread so it can be
+    pickled. The queue here never leaves the process, so records are passed
+    through untouched and formatted by the listener thread instead.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+class JSONFormatter(logging.Formatter):
+    """Formats a record as a single JSON object, including its ``extra`` fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'time': datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                data[key] = value
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def stop_logging() -> None:
+    """Stop the listener thread after it wrote every queued record.
+
+    Safe to call more than once. Call it before replacing the process with
+    one of the ``os.exec*`` functions, since those skip :mod:`atexit`.
+    """
+
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
+
+
+atexit.register(stop_logging)
 
 
 def stream_supports_colour(stream: Any) -> bool:
@@ -76,6 +219,11 @@ def setup_logging(
     uses different defaults and a colour formatter if the stream can
     display colour.
 
+    The stream and file handlers run on a listener thread behind a queue,
+    so writing to the terminal or disk never blocks the event loop.
+    Only the first call does anything, since ``bot.py`` is run once as
+    ``__main__`` and imported again by the cogs.
+
     This is used by the :class:`~discord.Client` to set up logging
     if ``log_handler`` is not ``None``.
 
@@ -98,6 +246,10 @@ def setup_logging(
         Unlike the default for :class:`~discord.Client`, this defaults to ``True``.
     """
 
+    global _listener
+    if _listener is not None:
+        return
+
     if level is MISSING:
         level = logging.INFO
 
@@ -121,11 +273,23 @@ def setup_logging(
         logger.handlers.clear()
 
     handler.setFormatter(formatter)
-    logger.setLevel(level)
-    logger.addHandler(handler)
-    if wb:
-        logger.addHandler(Discord_Handler(logger_webhook))
+    handlers = [handler]
 
     handler = logging.FileHandler(filename='discord.log', encoding='utf-8', mode='w')
     handler.setFormatter(logging.Formatter('%(asctime)s:%(levelname)s:%(name)s: %(message)s'))
-    logger.addHandler(handler)
+    handlers.append(handler)
+
+    if json_log_file:
+        handler = logging.FileHandler(filename=json_log_file, encoding='utf-8')
+        handler.setFormatter(JSONFormatter())
+        handlers.append(handler)
+
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+
+    logger.setLevel(level)
+    logger.addHandler(LazyQueueHandler(log_queue))
+    if wb:
+        # this one already hands its records off to a task
+        logger.addHandler(Discord_Handler(logger_webhook))
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from typing import Callable, Optional
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+
+from utils.metrics import LOOP_LAG, LOOP_STALLS
+
+log = logging.getLogger(__name__)
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop runs its callbacks.
+
+    A task sleeps for ``interval`` over and over and records how much later
+    than asked it woke up. A watchdog thread notices when that task hasn't
+    checked in for ``threshold`` seconds and grabs the loop thread's stack
+    while it is still stuck, so the culprit shows up in the report instead
+    of whatever runs after it.
+
+    ``on_stall`` is called on the loop with the length of the stall and the
+    stack that was captured, if any.
+    """
+
+    def __init__(
+        self,
+        *,
+        interval: float = 0.5,
+        threshold: float = 0.25,
+        on_stall: Optional[Callable[[float, Optional[str]], None]] = None
+    ) -> None:
+        self.interval = interval
+        self.threshold = threshold
+        self.on_stall = on_stall
+
+        self.max_lag = 0.0
+
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = time.monotonic()
+        self._stack: Optional[str] = None
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._sample())
+        self._thread = threading.Thread(target=self._watch, name='loop-lag-watchdog', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _sample(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            self._last_beat = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(loop.time() - start - self.interval, 0.0)
+            self._last_beat = time.monotonic()
+
+            LOOP_LAG.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+            if lag < self.threshold:
+                self._stack = None
+                continue
+
+            stack, self._stack = self._stack, None
+            LOOP_STALLS.inc()
+            if self.on_stall is not None:
+                try:
+                    self.on_stall(lag, stack)
+                except Exception:
+                    log.exception('Loop stall callback failed')
+
+    def _watch(self) -> None:
+        # the sampler sleeps for interval, so only the time past that is lag
+        while not self._stopped.wait(self.threshold / 2):
+            stalled = time.monotonic() - self._last_beat - self.interval
+            if stalled < self.threshold or self._stack is not None:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)  # type: ignore
+            if frame is not None:
+                self._stack = ''.join(traceback.format_stack(frame))
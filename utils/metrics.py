@@ -0,0 +1,334 @@
+from __future__ import annotations
+
+from typing import Any, Callable, Iterable, Optional, Union
+import bisect
+import logging
+import math
+import time
+
+import asyncpg
+from aiohttp import web
+
+log = logging.getLogger(__name__)
+
+LabelValues = tuple[str, ...]
+
+
+def _format_labels(names: tuple[str, ...], values: LabelValues, extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _label_value(value: Any) -> str:
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """The base of every metric, a name, help text and the names of its labels."""
+
+    type: str = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+
+    def _key(self, labels: dict[str, Any]) -> LabelValues:
+        if labels.keys() != set(self.labels):
+            raise ValueError(f'{self.name} takes the labels {", ".join(self.labels) or "(none)"}')
+        return tuple(_label_value(labels[name]) for name in self.labels)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """A value that only goes up."""
+
+    type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()) -> None:
+        super().__init__(name, documentation, labels)
+        self.values: dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels: Any) -> float:
+        return self.values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterable[str]:
+        for key, value in self.values.items():
+            yield f'{self.name}{_format_labels(self.labels, key)} {_format_value(value)}'
+
+
+class Gauge(Metric):
+    """A value that goes up and down.
+
+    Instead of being set, a gauge can be given a ``function`` that is called
+    on every scrape. It returns either a single value or a mapping of label
+    values to values.
+    """
+
+    type = 'gauge'
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Iterable[str] = (),
+        *,
+        function: Optional[Callable[[], Union[float, dict[LabelValues, float]]]] = None
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.values: dict[LabelValues, float] = {}
+        self.function = function
+
+    def set(self, value: float, **labels: Any) -> None:
+        self.values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: Any) -> None:
+        self.inc(-amount, **labels)
+
+    def samples(self) -> Iterable[str]:
+        values = self.values
+        if self.function is not None:
+            try:
+                result = self.function()
+            except Exception:
+                log.exception('Failed collecting %s', self.name)
+                return
+            values = result if isinstance(result, dict) else {(): result}
+
+        for key, value in values.items():
+            yield f'{self.name}{_format_labels(self.labels, key)} {_format_value(value)}'
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'start')
+
+    def __init__(self, histogram: Histogram, labels: dict[str, Any]) -> None:
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> _Timer:
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+
+class Histogram(Metric):
+    """Counts observations into cumulative buckets."""
+
+    type = 'histogram'
+
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Iterable[str] = (),
+        *,
+        buckets: Iterable[float] = DEFAULT_BUCKETS
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per bucket counts..., +Inf count, sum]
+        self.values: dict[LabelValues, list[float]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        data = self.values.get(key)
+        if data is None:
+            data = self.values[key] = [0] * (len(self.buckets) + 2)
+        data[bisect.bisect_left(self.buckets, value)] += 1
+        data[-1] += value
+
+    def time(self, **labels: Any) -> _Timer:
+        """Observe how long the ``with`` block takes."""
+        return _Timer(self, labels)
+
+    def count(self, **labels: Any) -> int:
+        data = self.values.get(self._key(labels))
+        return int(sum(data[:-1])) if data else 0
+
+    def total(self, **labels: Any) -> float:
+        data = self.values.get(self._key(labels))
+        return data[-1] if data else 0.0
+
+    def quantile(self, q: float, **labels: Any) -> float:
+        """The upper bound of the bucket the ``q`` quantile falls in."""
+
+        data = self.values.get(self._key(labels))
+        if not data:
+            return 0.0
+
+        target = q * sum(data[:-1])
+        cumulative = 0
+        for bound, count in zip((*self.buckets, math.inf), data):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return math.inf
+
+    def samples(self) -> Iterable[str]:
+        for key, data in self.values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), data):
+                cumulative += count
+                labels = _format_labels(self.labels, key, f'le="{_format_value(bound)}"')
+                yield f'{self.name}_bucket{labels} {_format_value(cumulative)}'
+            labels = _format_labels(self.labels, key)
+            yield f'{self.name}_sum{labels} {_format_value(data[-1])}'
+            yield f'{self.name}_count{labels} {_format_value(cumulative)}'
+
+
+class Registry:
+    """Holds metrics by name and renders them in the Prometheus text format.
+
+    The helpers return the metric already registered under a name, so a
+    reloaded extension keeps counting where it left off.
+    """
+
+    def __init__(self) -> None:
+        self.metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        existing = self.metrics.get(metric.name)
+        if existing is not None:
+            if type(existing) is not type(metric):
+                raise ValueError(f'{metric.name} is already registered as a {existing.type}')
+            return existing
+        self.metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))  # type: ignore
+
+    def gauge(self, name: str, documentation: str, labels: Iterable[str] = (), **kwargs: Any) -> Gauge:
+        gauge: Gauge = self.register(Gauge(name, documentation, labels, **kwargs))  # type: ignore
+        if 'function' in kwargs:
+            gauge.function = kwargs['function']
+        return gauge
+
+    def histogram(self, name: str, documentation: str, labels: Iterable[str] = (), **kwargs: Any) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, **kwargs))  # type: ignore
+
+    def render(self) -> str:
+        return '\n'.join(metric.render() for metric in self.metrics.values()) + '\n'
+
+
+registry = Registry()
+
+COMMANDS = registry.counter(
+    'metro_commands_total', 'Prefix and app commands completed.', ('command', 'app_command', 'failed')
+)
+COMMAND_LATENCY = registry.histogram(
+    'metro_command_duration_seconds', 'Time from invoking a command to it finishing.', ('command',)
+)
+COMMAND_PHASES = ('prefix', 'checks', 'conversion', 'callback', 'response')
+COMMAND_PHASE_LATENCY = registry.histogram(
+    'metro_command_phase_duration_seconds', 'Time spent in each phase of a command.', ('command', 'phase')
+)
+LISTENER_LATENCY = registry.histogram(
+    'metro_listener_duration_seconds', 'Time spent running event listeners.', ('event',)
+)
+GATEWAY_EVENTS = registry.counter(
+    'metro_gateway_events_total', 'Gateway dispatch events received.', ('type',)
+)
+LOOP_LAG = registry.histogram(
+    'metro_event_loop_lag_seconds', 'How late the event loop woke up a sleeping task.',
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+)
+LOOP_STALLS = registry.counter(
+    'metro_event_loop_stalls_total', 'Times the event loop lagged past the stall threshold.'
+)
+DB_LATENCY = registry.histogram(
+    'metro_db_query_duration_seconds', 'Time spent running database queries.', ('method',)
+)
+
+
+class MetricsConnection(asyncpg.Connection):
+    """An :class:`asyncpg.Connection` that records how long its queries take.
+
+    Pass it to :func:`asyncpg.create_pool` as ``connection_class``.
+    """
+
+    async def execute(self, query: str, *args: Any, **kwargs: Any) -> str:
+        with DB_LATENCY.time(method='execute'):
+            return await super().execute(query, *args, **kwargs)
+
+    async def executemany(self, command: str, args: Any, **kwargs: Any) -> None:
+        with DB_LATENCY.time(method='executemany'):
+            return await super().executemany(command, args, **kwargs)
+
+    async def fetch(self, query: str, *args: Any, **kwargs: Any) -> list:
+        with DB_LATENCY.time(method='fetch'):
+            return await super().fetch(query, *args, **kwargs)
+
+    async def fetchrow(self, query: str, *args: Any, **kwargs: Any) -> Any:
+        with DB_LATENCY.time(method='fetchrow'):
+            return await super().fetchrow(query, *args, **kwargs)
+
+    async def fetchval(self, query: str, *args: Any, **kwargs: Any) -> Any:
+        with DB_LATENCY.time(method='fetchval'):
+            return await super().fetchval(query, *args, **kwargs)
+
+    async def copy_records_to_table(self, table_name: str, **kwargs: Any) -> str:
+        with DB_LATENCY.time(method='copy'):
+            return await super().copy_records_to_table(table_name, **kwargs)
+
+
+class MetricsServer:
+    """Serves a registry on ``/metrics`` over plain HTTP."""
+
+    def __init__(self, registry: Registry = registry, *, host: str = '127.0.0.1', port: int = 9180) -> None:
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._runner: Optional[web.AppRunner] = None
+
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.registry.render(), content_type='text/plain', charset='utf-8')
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        log.info('Serving metrics on http://%s:%s/metrics', self.host, self.port)
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
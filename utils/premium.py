@@ -0,0 +1,73 @@
+from typing import Optional
+import datetime
+import heapq
+
+import discord
+
+
+class PremiumCache:
+    """Who has premium, held in memory so checks never hit the database.
+
+    Users get premium by voting and keep it until their ``next_vote`` time.
+    Expired users are dropped lazily from a heap ordered by expiry whenever
+    the cache is read, so lookups stay O(1) amortized without a background
+    task. Guilds are given premium by support staff and keep it until it is
+    removed.
+    """
+
+    def __init__(self) -> None:
+        self.users: dict[int, datetime.datetime] = {}
+        self.guilds: set[int] = set()
+        self._expiry: list[tuple[datetime.datetime, int]] = []
+
+    def __repr__(self) -> str:
+        return f'<PremiumCache users={len(self.users)} guilds={len(self.guilds)}>'
+
+    def _expire(self) -> None:
+        heap = self._expiry
+        if not heap:
+            return
+
+        now = discord.utils.utcnow()
+        while heap and heap[0][0] <= now:
+            expires, user_id = heapq.heappop(heap)
+            # the user may have voted again since this entry was pushed
+            if self.users.get(user_id) == expires:
+                del self.users[user_id]
+
+    def add_user(self, user_id: int, expires: datetime.datetime) -> None:
+        """Give a user premium until ``expires``, an aware UTC datetime."""
+
+        if expires <= discord.utils.utcnow():
+            return
+        self.users[user_id] = expires
+        heapq.heappush(self._expiry, (expires, user_id))
+
+    def user_expires(self, user_id: int) -> Optional[datetime.datetime]:
+        """When the user's premium runs out, ``None`` if they don't have it."""
+
+        self._expire()
+        return self.users.get(user_id)
+
+    def is_premium_user(self, user_id: int) -> bool:
+        self._expire()
+        return user_id in self.users
+
+    def add_guild(self, guild_id: int) -> None:
+        self.guilds.add(guild_id)
+
+    def remove_guild(self, guild_id: int) -> None:
+        self.guilds.discard(guild_id)
+
+    def is_premium_guild(self, guild_id: Optional[int]) -> bool:
+        return guild_id in self.guilds
+
+    def is_premium(self, user_id: int, guild_id: Optional[int] = None) -> bool:
+        """Whether the user or the guild they're in has premium."""
+
+        return guild_id in self.guilds or self.is_premium_user(user_id)
+
+    def clear(self) -> None:
+        self.users.clear()
+        self.guilds.clear()
+        self._expiry.clear()
@@ -0,0 +1,133 @@
+from typing import Any, Callable, Iterable, Union
+import json
+import logging
+import os
+import time
+
+import asyncpg
+
+from utils.json_loader import get_path
+
+log = logging.getLogger(__name__)
+
+# bump this whenever the shape of a saved cache changes
+SNAPSHOT_VERSION = 2
+
+SNAPSHOT_PATH = get_path() + '/config/cache_snapshot.json'
+
+# cache name -> (tables the cache is built from, json serializable data)
+Caches = dict[str, tuple[Iterable[str], Any]]
+
+# cache name -> {'watermarks': {table: version}, 'data': ...} as saved in the file
+SavedCaches = dict[str, dict[str, Any]]
+
+
+async def table_watermarks(db: Union[asyncpg.Pool, asyncpg.Connection]) -> dict[str, int]:
+    """The version of every table that has one.
+
+    Versions live in ``table_versions`` and are bumped by a statement trigger
+    in the same transaction as every write to the table, see migration 0007.
+    Tables without a version are never trusted."""
+
+    records = await db.fetch('SELECT table_name, version FROM table_versions;')
+    return {record['table_name']: record['version'] for record in records}
+
+
+async def write_snapshot(db: asyncpg.Pool, dump: Callable[[], Caches], *, path: str = SNAPSHOT_PATH) -> None:
+    """Save the caches returned by ``dump`` along with the versions of their tables.
+
+    The versions are read before the caches are dumped, so a write landing
+    in between makes the snapshot look older than it is rather than newer."""
+
+    watermarks = await table_watermarks(db)
+    caches = dump()
+
+    data = {
+        'version': SNAPSHOT_VERSION,
+        'created': time.time(),
+        'caches': {
+            name: {
+                'watermarks': {table: watermarks.get(table) for table in cache_tables},
+                'data': cache
+            }
+            for name, (cache_tables, cache) in caches.items()
+        }
+    }
+
+    # written next to the target and swapped in so a crash never leaves half a file
+    temp = path + '.tmp'
+    with open(temp, 'w') as file:
+        json.dump(data, file)
+    os.replace(temp, path)
+
+
+def _stale_tables(cache: dict[str, Any], watermarks: dict[str, int]) -> list[str]:
+    return [
+        table for table, watermark in cache['watermarks'].items()
+        if watermark is None or watermarks.get(table) != watermark
+    ]
+
+
+async def read_snapshot(db: asyncpg.Pool, *, max_age: float, path: str = SNAPSHOT_PATH) -> SavedCaches:
+    """Load the caches from a snapshot that are still up to date.
+
+    The whole snapshot is thrown away when it's from another version or older
+    than ``max_age`` seconds, and a single cache when one of its tables changed
+    since it was saved. The file is removed so it's only ever used once.
+
+    Tables can still change before the caches are used, so pass the result
+    through :func:`validate_snapshot` right before applying it."""
+
+    try:
+        with open(path) as file:
+            data = json.load(file)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        log.warning('Could not read the cache snapshot: %s', e)
+        data = None
+    finally:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    if not isinstance(data, dict) or data.get('version') != SNAPSHOT_VERSION:
+        return {}
+
+    age = time.time() - data.get('created', 0)
+    if not 0 <= age <= max_age:
+        log.info('Ignoring a cache snapshot from %.0fs ago.', age)
+        return {}
+
+    caches: SavedCaches = data['caches']
+    watermarks = await table_watermarks(db)
+
+    restored: SavedCaches = {}
+    for name, cache in caches.items():
+        stale = _stale_tables(cache, watermarks)
+        if stale:
+            log.info('Not restoring the %s cache, %s changed.', name, ', '.join(stale))
+            continue
+        restored[name] = cache
+
+    log.info('Restored %s of %s caches from a snapshot taken %.1fs ago.', len(restored), len(caches), age)
+    return restored
+
+
+async def validate_snapshot(db: Union[asyncpg.Pool, asyncpg.Connection], caches: SavedCaches) -> dict[str, Any]:
+    """The data of the caches from :func:`read_snapshot` whose tables haven't changed since."""
+
+    if not any(cache['watermarks'] for cache in caches.values()):
+        # nothing to check, caches without tables are only limited by the snapshot's age
+        return {name: cache['data'] for name, cache in caches.items()}
+
+    watermarks = await table_watermarks(db)
+    valid: dict[str, Any] = {}
+    for name, cache in caches.items():
+        stale = _stale_tables(cache, watermarks)
+        if stale:
+            log.info('Not restoring the %s cache, %s changed during startup.', name, ', '.join(stale))
+            continue
+        valid[name] = cache['data']
+    return valid
@@ -0,0 +1,251 @@
+from collections import Counter
+from typing import Any, Awaitable, Callable, Optional
+import asyncio
+import datetime
+import heapq
+import itertools
+import logging
+
+import discord
+
+log = logging.getLogger(__name__)
+
+
+class TimerHeap:
+    """A min-heap of timers ordered by when they expire.
+
+    Timers are indexed by ID so they can be replaced or cancelled in O(log n).
+    Cancelled entries stay in the heap and are skipped once they reach the top.
+    """
+
+    def __init__(self) -> None:
+        self._heap: list[list[Any]] = []
+        self._entries: dict[Any, list[Any]] = {}
+        self._counter = itertools.count()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, timer_id: Any) -> bool:
+        return timer_id in self._entries
+
+    def __iter__(self):
+        return (entry[2] for entry in self._entries.values())
+
+    def push(self, timer: Any) -> None:
+        """Add a timer, replacing any queued timer with the same ID."""
+
+        self.remove(timer.id)
+        entry = [timer.expires, next(self._counter), timer]
+        self._entries[timer.id] = entry
+        heapq.heappush(self._heap, entry)
+
+    def remove(self, timer_id: Any) -> bool:
+        """Cancel a queued timer. Returns whether it was queued."""
+
+        entry = self._entries.pop(timer_id, None)
+        if entry is None:
+            return False
+        entry[2] = None
+        return True
+
+    def discard(self, predicate: Callable[[Any], bool]) -> int:
+        """Cancel every queued timer matching ``predicate``."""
+
+        to_remove = [timer_id for timer_id, entry in self._entries.items() if predicate(entry[2])]
+        for timer_id in to_remove:
+            self.remove(timer_id)
+        return len(to_remove)
+
+    def peek(self) -> Optional[Any]:
+        """The timer that expires first, without removing it."""
+
+        heap = self._heap
+        while heap and heap[0][2] is None:
+            heapq.heappop(heap)
+        return heap[0][2] if heap else None
+
+    def pop(self) -> Optional[Any]:
+        """Remove and return the timer that expires first."""
+
+        timer = self.peek()
+        if timer is not None:
+            heapq.heappop(self._heap)
+            del self._entries[timer.id]
+        return timer
+
+    def clear(self) -> None:
+        self._heap.clear()
+        self._entries.clear()
+
+
+async def claim_timers(
+    connection: Any,
+    owner: str,
+    *,
+    until: datetime.datetime,
+    now: datetime.datetime,
+    lease: datetime.timedelta,
+    limit: int
+) -> list[Any]:
+    """Lease up to ``limit`` rows of ``reminders`` expiring before ``until`` to ``owner``.
+
+    ``SKIP LOCKED`` keeps concurrent claimers from taking the same rows, and
+    rows whose lease ran out before ``now`` are free to be claimed again.
+    """
+
+    query = """UPDATE reminders SET claimed_by = $2, lease_expires = $3
+               WHERE id IN (
+                   SELECT id FROM reminders
+                   WHERE expires <= $1 AND (lease_expires IS NULL OR lease_expires < $4)
+                   ORDER BY expires
+                   LIMIT $5
+                   FOR UPDATE SKIP LOCKED
+               )
+               RETURNING *;
+            """
+    return await connection.fetch(query, until, owner, now + lease, now, limit)
+
+
+async def renew_leases(connection: Any, owner: str, ids: list[int], *, expires: datetime.datetime) -> None:
+    """Push back the leases ``owner`` still holds on ``ids``."""
+
+    query = """UPDATE reminders SET lease_expires = $1
+               WHERE claimed_by = $2 AND id = ANY($3::bigint[]);
+            """
+    await connection.execute(query, expires, owner, ids)
+
+
+async def release_timer(connection: Any, timer_id: int, owner: str, *, retry_at: datetime.datetime) -> bool:
+    """Give up ``owner``'s lease on a timer so it's claimed again after ``retry_at``."""
+
+    query = """UPDATE reminders SET claimed_by = NULL, lease_expires = $3
+               WHERE id = $1 AND claimed_by = $2;
+            """
+    status = await connection.execute(query, timer_id, owner, retry_at)
+    return status != 'UPDATE 0'
+
+
+async def delete_claimed_timer(connection: Any, timer_id: int, owner: str) -> bool:
+    """Delete a timer row, but only while ``owner`` holds its lease."""
+
+    query = "DELETE FROM reminders WHERE id = $1 AND claimed_by = $2;"
+    status = await connection.execute(query, timer_id, owner)
+    return status != 'DELETE 0'
+
+
+class TimerExecutor:
+    """Runs ``on_<event>_timer_complete`` listeners with bounded concurrency.
+
+    Every timer event gets its own semaphore so a burst of one kind of timer,
+    like a lot of giveaways ending at once, cannot starve the others.
+
+    Only the listeners added with :meth:`commands.Bot.add_listener`, which is
+    every ``commands.Cog.listener``, run under the semaphore. ``wait_for``
+    waiters and ``on_<event>_timer_complete`` methods defined on the bot are
+    still handed the event through :meth:`discord.Client.dispatch`, the part
+    of dispatching that doesn't call those listeners again.
+
+    ``timeouts`` maps an event to how many seconds its listeners may run for
+    before they're cancelled, counted from when the bot is ready. Events
+    missing from it, or mapped to ``None``, never time out.
+    """
+
+    def __init__(
+        self,
+        bot: Any,
+        *,
+        limits: Optional[dict[str, int]] = None,
+        timeouts: Optional[dict[str, Optional[float]]] = None,
+        default_limit: int = 10
+    ) -> None:
+        self.bot = bot
+        self.limits = limits or {}
+        self.timeouts = timeouts or {}
+        self.default_limit = default_limit
+
+        self.waiting: Counter[str] = Counter()
+        self.running: Counter[str] = Counter()
+        self.completed: Counter[str] = Counter()
+        self.failed: Counter[str] = Counter()
+        self.timed_out: Counter[str] = Counter()
+
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def queue_depth(self) -> int:
+        """Timers waiting for a free slot across every event."""
+        return sum(self.waiting.values())
+
+    def _semaphore(self, event: str) -> asyncio.Semaphore:
+        semaphore = self._semaphores.get(event)
+        if semaphore is None:
+            limit = self.limits.get(event, self.default_limit)
+            semaphore = self._semaphores[event] = asyncio.Semaphore(limit)
+        return semaphore
+
+    def submit(self, timer: Any, *, done: Optional[Callable[[Any, bool], Awaitable[None]]] = None) -> None:
+        """Schedule the listeners of a timer that just fired.
+
+        ``done`` is awaited with the timer once every listener has finished,
+        along with whether they all ran to the end. It's ``False`` when one
+        timed out or the run was cancelled, so the timer should be retried
+        rather than forgotten. Listeners that raised did run to the end.
+        """
+
+        task = asyncio.create_task(self._run(timer, done), name=f'timer-{timer.event}-{timer.id}')
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, timer: Any, done: Optional[Callable[[Any, bool], Awaitable[None]]]) -> None:
+        finished = False
+        try:
+            finished = await self._run_listeners(timer)
+        finally:
+            if done is not None:
+                try:
+                    await done(timer, finished)
+                except Exception:
+                    log.exception('Failed finishing timer %s (%s)', timer.id, timer.event)
+
+    async def _run_listeners(self, timer: Any) -> bool:
+        event = timer.event
+        event_name = f'{event}_timer_complete'
+
+        # waiters and bot methods, BotBase.dispatch would run the listeners below twice
+        discord.Client.dispatch(self.bot, event_name, timer)
+
+        listeners = list(self.bot.extra_events.get(f'on_{event_name}', []))
+        if not listeners:
+            return True
+
+        timeout = self.timeouts.get(event)
+        if timeout is not None:
+            # overdue timers fire before login, don't let a slow start eat their timeout
+            await self.bot.wait_until_ready()
+
+        finished = True
+        self.waiting[event] += 1
+        async with self._semaphore(event):
+            self.waiting[event] -= 1
+            self.running[event] += 1
+            try:
+                for listener in listeners:
+                    try:
+                        await asyncio.wait_for(listener(timer), timeout)
+                    except asyncio.TimeoutError:
+                        finished = False
+                        self.timed_out[event] += 1
+                        log.warning('Timer %s (%s) listener %s timed out after %ss.', timer.id, event, listener.__qualname__, timeout)
+                    except Exception:
+                        self.failed[event] += 1
+                        try:
+                            await self.bot.on_error(event_name, timer)
+                        except Exception:
+                            pass
+                    else:
+                        self.completed[event] += 1
+            finally:
+                self.running[event] -= 1
+        return finished
@@ -25,7 +25,7 @@ class Embed(discord.Embed):
 def dynamic_cooldown(ctx: MyContext):
     """Dyanmic cooldown for premium users."""
 
-    if ctx.bot.premium_guilds.get(ctx.guild.id) or ctx.bot.premium_users.get(ctx.author.id):
+    if ctx.bot.premium.is_premium(ctx.author.id, ctx.guild and ctx.guild.id):
         return commands.Cooldown(3, 6)
     return commands.Cooldown(3, 8)
 